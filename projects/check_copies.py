@@ -0,0 +1,63 @@
+"""
+Checks that the modules copied into several projects are still identical.
+
+Each project is a standalone app, run from its own folder with its own
+requirements, so a few shared modules are copied into every project
+that uses them instead of being imported from one place. Edit one copy,
+then copy it over the others; this check (also run by the tests in
+tests/test_copies.py) fails when they have drifted apart:
+
+    python check_copies.py
+"""
+
+import difflib
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# every group lists the copies of one module (paths from projects/)
+COPIES = {
+    "compression.py": [
+        "todo_tasks/compression.py",
+        "student_api/compression.py",
+        "login_web_app/app/compression.py",
+        "vehicle-form-app/beginner-form/backend/compression.py",
+    ],
+    "shared_state.py": [
+        "todo_tasks/shared_state.py",
+        "student_api/shared_state.py",
+        "login_web_app/app/shared_state.py",
+    ],
+    "pool_metrics.py": [
+        "vehicle-form-app/beginner-form/backend/pool_metrics.py",
+        "employee_dbs_system/pool_metrics.py",
+    ],
+}
+
+
+def read(path):
+    with open(os.path.join(HERE, path), encoding="utf-8") as f:
+        return f.read()
+
+
+def differences():
+    """One unified diff (against the group's first copy) per stray copy"""
+    found = []
+    for paths in COPIES.values():
+        first = read(paths[0])
+        for path in paths[1:]:
+            other = read(path)
+            if other != first:
+                found.append("".join(difflib.unified_diff(
+                    first.splitlines(True), other.splitlines(True),
+                    paths[0], path)))
+    return found
+
+
+if __name__ == "__main__":
+    diffs = differences()
+    for diff in diffs:
+        print(diff)
+    print(f"{len(diffs)} copies differ" if diffs else "all copies match")
+    sys.exit(1 if diffs else 0)
@@ -1,5 +1,8 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
+
+from pool_metrics import PoolMetrics, pool_settings
 
 # To load environment variables from a .env file
 from dotenv import load_dotenv
@@ -21,13 +24,27 @@ DATABASE_URL = (
     f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
+# Pool counters (checkouts, in-use, wait times), exposed by GET /metrics
+pool_metrics = PoolMetrics()
+
 # Create the SQLAlchemy engine (connects to the database)
-engine = create_engine(DATABASE_URL)
+# Pool size/overflow/timeout/recycle/pre-ping are read from the
+# DB_POOL_* variables in .env (see pool_metrics.py)
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=pool_metrics.pool_class(QueuePool),
+    **pool_settings()
+)
+pool_metrics.attach(engine)
 
 # Create a configured "Session" class
 # autocommit=False -> changes are not saved automatically
 # autoflush=False -> changes are not flushed until commit()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False -> objects keep their values after commit(),
+#   and PostgreSQL returns the new id with INSERT ... RETURNING,
+#   so no refresh() (second SELECT) is needed after a write
+SessionLocal = sessionmaker(autocommit=False, autoflush=False,
+                            expire_on_commit=False, bind=engine)
 
 # Base class for SQLAlchemy models (used to define tables)
 Base = declarative_base()
@@ -1,6 +1,10 @@
-from fastapi import FastAPI, Depends
+import json
+
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from database import Base, engine, get_db  # Import DB connection & session
+# Import DB connection & session
+from database import Base, SessionLocal, engine, get_db, pool_metrics
 from models import Employee  # Import Employee model
 
 # Initialize FastAPI app
@@ -10,12 +14,44 @@ app = FastAPI()
 Base.metadata.create_all(bind=engine)
 
 
+# NDJSON streaming: clients sending "Accept: application/x-ndjson"
+# get one employee per line, read from the DB in batches
+NDJSON = "application/x-ndjson"
+STREAM_BATCH = 500
+
+
+def stream_employees():
+    # the generator runs after the request's own session is closed,
+    # so it opens (and closes) a session of its own
+    db = SessionLocal()
+    try:
+        lines = []
+        for employee in db.query(Employee).yield_per(STREAM_BATCH):
+            lines.append(json.dumps({"id": employee.id,
+                                     "name": employee.name,
+                                     "position": employee.position}) + "\n")
+            if len(lines) == STREAM_BATCH:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+    finally:
+        db.close()
+
+
 # Root endpoint to test if FastAPI + PostgreSQL is working
 @app.get("/")
 def root():
     return {"message": "FastAPI + PostgreSQL is working!"}
 
 
+# Connection pool metrics: checkouts, connections in use,
+# checkout wait times and pool timeouts
+@app.get("/metrics")
+def metrics():
+    return {"db_pool": pool_metrics.snapshot(engine.pool)}
+
+
 # POST endpoint to create a new employee
 @app.post("/employees/")
 def create_employee(
@@ -26,14 +62,16 @@ def create_employee(
     # Create a new Employee object
     employee = Employee(name=name, position=position)
     db.add(employee)  # Add to session
-    db.commit()  # Commit to database
-    # Refresh object to get DB-generated fields (e.g., id)
-    db.refresh(employee)
+    # Commit to database; the id comes back with the INSERT itself
+    db.commit()
     return employee  # Return the newly created employee
 
 
 # GET endpoint to read all employees from the database
 @app.get("/employees/")
-def read_employees(db: Session = Depends(get_db)):
+def read_employees(request: Request, db: Session = Depends(get_db)):
+    # Stream rows as NDJSON when the client asks for it
+    if NDJSON in request.headers.get("accept", ""):
+        return StreamingResponse(stream_employees(), media_type=NDJSON)
     # Query all Employee records
     return db.query(Employee).all()
@@ -1,19 +1,29 @@
-from fastapi import APIRouter, Request, Form
+from fastapi import APIRouter, Depends, Request, Form
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 
+from .config import settings
 from .models import User
+from .security import hash_password, verify_password
+from .sessions import SessionUser, create_session, current_user, \
+    forget_session
+from .shared_state import open_store
+from .templating import cached_page, templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
-# In-memory "database"
-users_db = {}
+# In-memory "database": email -> User
+# (shared by all workers when settings.state_backend is "sqlite")
+users_db = open_store("users",
+                      encode=User.model_dump_json,
+                      decode=User.model_validate_json,
+                      backend=settings.state_backend,
+                      path=settings.state_path)
 
 
 @router.get("/login")
-async def login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+async def login_page():
+    # the empty form is the same for everyone: pre-rendered
+    return cached_page("login.html")
 
 
 @router.post("/login")
@@ -21,19 +31,37 @@ async def login(request: Request,
                 email: str = Form(...),
                 password: str = Form(...)):
     user = users_db.get(email)
-    if user and user.password == password:
-        # Redirect to dashboard with user's name
+    # bcrypt runs in the hashing thread pool, not on the event loop
+    valid, new_hash = await verify_password(
+        password, user.password if user else None)
+    if valid and new_hash:
+        # stored with an old bcrypt_rounds (or as plain text):
+        # save the new hash, unless the password changed meanwhile
+        async with users_db.writing():
+            current = users_db.get(email)
+            if current and current.password == user.password:
+                users_db[email] = current.model_copy(
+                    update={"password": new_hash})
+    if valid:
+        # Redirect to dashboard, with the signed session cookie that
+        # tells it who is logged in
         response = RedirectResponse(url="/dashboard", status_code=303)
+        response.set_cookie(
+            settings.session_cookie,
+            create_session(email, f"{user.fname} {user.lname}"),
+            max_age=settings.session_ttl,
+            httponly=True,                 # not readable from JavaScript
+            samesite="lax",
+            secure=not settings.debug)     # HTTPS only in production
         return response
-    return templates.TemplateResponse("login.html", {
-        "request": request,
+    return templates.TemplateResponse(request, "login.html", {
         "error": "Invalid credentials"
     })
 
 
 @router.get("/signup")
-async def signup_page(request: Request):
-    return templates.TemplateResponse("signup.html", {"request": request})
+async def signup_page():
+    return cached_page("signup.html")
 
 
 @router.post("/signup")
@@ -45,15 +73,20 @@ async def signup(
     mobile: str = Form(...),
     password: str = Form(...),
 ):
-    if email in users_db:
-        return templates.TemplateResponse("signup.html",
-                                          {"request": request,
-                                           "error": "Email already registered"
-                                           })
+    # hash before taking the write lock: bcrypt is slow and other
+    # workers should not wait for it
+    password_hash = await hash_password(password)
 
-    new_user = User(fname=fname, lname=lname, email=email,
-                    mobile=mobile, password=password)
-    users_db[email] = new_user
+    # writing() makes the check + insert atomic across workers
+    async with users_db.writing():
+        if email in users_db:
+            return templates.TemplateResponse(
+                request, "signup.html",
+                {"error": "Email already registered"})
+
+        new_user = User(fname=fname, lname=lname, email=email,
+                        mobile=mobile, password=password_hash)
+        users_db[email] = new_user
 
     # After signup, redirect to login
     response = RedirectResponse(url="/login", status_code=303)
@@ -61,9 +94,16 @@ async def signup(
 
 
 @router.get("/dashboard")
-async def dashboard(request: Request):
-    # Just a placeholder: you’d normally use sessions/tokens
-    return templates.TemplateResponse("dashboard.html",
-                                      {"request": request,
-                                       "user_name": "Test User"
-                                       })
+async def dashboard(request: Request,
+                    user: SessionUser = Depends(current_user)):
+    # current_user checked the session cookie (or redirected to /login)
+    return templates.TemplateResponse(request, "dashboard.html",
+                                      {"user_name": user.name})
+
+
+@router.get("/logout")
+async def logout(request: Request):
+    forget_session(request.cookies.get(settings.session_cookie))
+    response = RedirectResponse(url="/login", status_code=303)
+    response.delete_cookie(settings.session_cookie)
+    return response
@@ -3,8 +3,41 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     app_name: str = "FastAPI Auth Example"
+    # signs the session cookies (sessions.py): set SECRET_KEY to a
+    # long random value, the same in every worker/server
     secret_key: str = "supersecretkey"
+    # debug also turns on template auto-reload (templating.py)
     debug: bool = True
+    # "memory": per-process users_db, "sqlite": one SQLite file
+    # (state_path) shared by every uvicorn worker
+    state_backend: str = "memory"
+    state_path: str = "shared_state.db"
+    # folder for compiled templates ("": the system temp folder)
+    template_cache_dir: str = ""
+    # output of build_static.py, served at /static when it exists
+    static_build_dir: str = "static_build"
+    # bcrypt work factor (each +1 doubles the time per hash); stored
+    # hashes made with another value are re-hashed on the next login
+    bcrypt_rounds: int = 12
+    # threads that run bcrypt, so hashing never blocks the event loop
+    # and at most this many hashes run at once
+    hash_workers: int = 4
+    # session cookie name, lifetime in seconds, and how many recently
+    # checked session tokens each worker remembers
+    session_cookie: str = "session"
+    session_ttl: int = 3600
+    session_cache_size: int = 1024
+    # attempts allowed per client ("<count>/<second|minute|hour|day>"),
+    # extra ones get a 429 before any password is hashed
+    login_rate_limit: str = "5/minute"
+    signup_rate_limit: str = "3/minute"
+    # "memory": counted per worker, "sqlite": shared through its own
+    # SQLite file (rate_limit_path), so the users store's write lock
+    # never holds up the check
+    rate_limit_backend: str = "memory"
+    rate_limit_path: str = "rate_limits.db"
+    # count clients by X-Forwarded-For (only behind a reverse proxy)
+    rate_limit_trust_proxy: bool = False
 
 
 settings = Settings()
@@ -1,17 +1,32 @@
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.auth import router as auth_router
+from app.compression import CompressionMiddleware
 from app.users import router as users_router
 from app.config import settings
+from app.rate_limit import RateLimit, RateLimitMiddleware
+from app.static_files import static_files
+from app.templating import cached_page
 
 
 # Initialize FastAPI app
 app = FastAPI(title=settings.app_name, debug=settings.debug)
 
+# Rate limiting for the password forms (rate_limit.py)
+# added before CORS so that 429 responses still get CORS headers
+app.add_middleware(
+    RateLimitMiddleware,
+    limits={
+        ("POST", "/login"): RateLimit.parse(settings.login_rate_limit),
+        ("POST", "/signup"): RateLimit.parse(settings.signup_rate_limit),
+    },
+    backend=settings.rate_limit_backend,
+    path=settings.rate_limit_path,
+    trust_proxy=settings.rate_limit_trust_proxy
+)
+
 # CORS Middleware (for frontend integration/testing)
 app.add_middleware(
     CORSMiddleware,
@@ -21,18 +36,20 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-# Static files & templates
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+# Response compression (gzip / brotli / zstd) for pages and JSON;
+# precompressed static files are passed through as they are
+app.add_middleware(CompressionMiddleware)
+
+# Static files: the fingerprinted build when there is one
+# (app/static_files.py), templates: app/templating.py
+app.mount("/static", static_files(), name="static")
 
 
 # Home page
 @app.get("/")
-async def index(request: Request):
-    return templates.TemplateResponse("index.html",
-                                      {"request": request,
-                                       "title": "Login Web App"
-                                       })
+async def index():
+    # same HTML for every visitor: rendered once, then reused
+    return cached_page("index.html", title="Login Web App")
 
 
 # Routers
@@ -14,6 +14,7 @@ class SignupRequest(BaseModel):
     password: str
 
 
+# password holds the bcrypt hash (security.py), never the plain text
 class User(BaseModel):
     fname: str
     lname: str
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# =====================
+# Rate limiting (token bucket)
+#
+# Every client gets a bucket per limited route, holding up to `burst`
+# tokens and refilled at `rate` tokens per second. A request takes one
+# token; with an empty bucket it is answered 429 Too Many Requests.
+#
+# RateLimitMiddleware is plain ASGI: it runs before FastAPI reads the
+# form, so a rejected login costs no bcrypt hash and no template.
+#
+# Backends:
+# - MemoryBuckets: a dict per worker. It is only touched from the event
+#   loop, and each check reads and writes without awaiting in between,
+#   so no lock is needed
+# - SQLiteBuckets: one SQLite file shared by every worker (like
+#   shared_state.py), so `uvicorn --workers N` does not multiply the limit.
+#   A check never waits inside SQLite: when another worker holds the
+#   file's lock it retries with asyncio.sleep (the event loop keeps
+#   serving other requests), and after `busy_timeout` seconds the
+#   attempt is refused like an empty bucket
+# Buckets that have refilled completely are the same as no bucket, so
+# both backends drop them every `sweep_interval` seconds.
+# =====================
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimit:
+    def __init__(self, burst: int, per_seconds: float):
+        self.burst = burst
+        self.rate = burst / per_seconds      # tokens per second
+
+    @classmethod
+    def parse(cls, text: str) -> "RateLimit":
+        # "5/minute" -> 5 requests at once, then one every 12 seconds
+        count, _, period = text.partition("/")
+        return cls(int(count), PERIODS[period.strip()])
+
+
+class MemoryBuckets:
+    def __init__(self, sweep_interval: float = 60):
+        # key -> [tokens, last update time, time it is full again]
+        self._buckets: Dict[str, List[float]] = {}
+        self._sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        """Takes a token; returns 0, or the seconds until one is free"""
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        bucket = self._buckets.get(key)
+        tokens = limit.burst if bucket is None else \
+            min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+        if tokens < 1:
+            return (1 - tokens) / limit.rate
+        tokens -= 1
+        self._buckets[key] = [tokens, now,
+                              now + (limit.burst - tokens) / limit.rate]
+        return 0
+
+    def _sweep(self, now: float) -> None:
+        self._next_sweep = now + self._sweep_interval
+        for key, (_, _, full_at) in list(self._buckets.items()):
+            if full_at < now:
+                del self._buckets[key]
+
+
+class SQLiteBuckets:
+    # one UPSERT does the whole check: the row is only changed (and
+    # returned) when the refilled bucket has a token to spend
+    TAKE = """
+        INSERT INTO rate_limits (key, tokens, updated, full_at)
+        VALUES (:key, :burst - 1, :now, :now + 1 / :rate)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = min(:burst, tokens + (:now - updated) * :rate) - 1,
+            updated = :now,
+            full_at = :now + (:burst - min(:burst, tokens
+                              + (:now - updated) * :rate) + 1) / :rate
+        WHERE min(:burst, tokens + (:now - updated) * :rate) >= 1
+        RETURNING tokens
+    """
+
+    def __init__(self, path: str, sweep_interval: float = 60,
+                 busy_timeout: float = 1):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, isolation_level=None,
+                                   check_same_thread=False)
+        # waiting inside SQLite is only fine at startup
+        self._db.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key     TEXT PRIMARY KEY,
+                tokens  REAL NOT NULL,
+                updated REAL NOT NULL,
+                full_at REAL NOT NULL    -- when the bucket is full again
+            )""")
+        self._db.execute("PRAGMA busy_timeout=0")
+        self._sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+        self._busy_timeout = busy_timeout
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        deadline = time.monotonic() + self._busy_timeout
+        pause = 0.001
+        while True:
+            wait = self._try_take(key, limit)
+            if wait is not None:
+                return wait
+            if time.monotonic() >= deadline:
+                # still locked: refuse rather than let attempts through
+                return 1
+            await asyncio.sleep(pause)
+            pause = min(pause * 2, 0.05)
+
+    def _try_take(self, key: str, limit: RateLimit) -> Optional[float]:
+        # None when the lock or the file is taken (try again later)
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            return self._take(key, limit)
+        except sqlite3.OperationalError as exc:
+            if "locked" not in str(exc) and "busy" not in str(exc):
+                raise
+            return None
+        finally:
+            self._lock.release()
+
+    def _take(self, key: str, limit: RateLimit) -> float:
+        # wall clock, not monotonic: it is compared across processes
+        now = time.time()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self._sweep_interval
+            self._db.execute("DELETE FROM rate_limits WHERE full_at < ?",
+                             (now,))
+        row = self._db.execute(self.TAKE, {
+            "key": key, "burst": limit.burst, "rate": limit.rate,
+            "now": now}).fetchone()
+        if row is not None:
+            return 0
+        tokens, updated = self._db.execute(
+            "SELECT tokens, updated FROM rate_limits WHERE key = ?",
+            (key,)).fetchone()
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        return max((1 - tokens) / limit.rate, 0.001)
+
+
+# =====================
+# Middleware
+# =====================
+class RateLimitMiddleware:
+    def __init__(self, app,
+                 limits: Dict[Tuple[str, str], RateLimit],
+                 backend: str = "memory",
+                 path: str = "shared_state.db",
+                 trust_proxy: bool = False):
+        # limits: (method, path) -> RateLimit, e.g. ("POST", "/login")
+        self.app = app
+        self.limits = limits
+        self.buckets = SQLiteBuckets(path) if backend == "sqlite" \
+            else MemoryBuckets()
+        self.trust_proxy = trust_proxy
+
+    def client_key(self, scope) -> str:
+        if self.trust_proxy:
+            # behind a reverse proxy every request comes from the
+            # proxy, which appends the real client to X-Forwarded-For
+            # (the last entry: earlier ones are sent by the client and
+            # could be anything)
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[-1].strip()
+        client: Optional[Tuple[str, int]] = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limit = self.limits.get((scope["method"], scope["path"]))
+        if limit is None:
+            return await self.app(scope, receive, send)
+        key = f'{scope["method"]} {scope["path"]} {self.client_key(scope)}'
+        wait = await self.buckets.take(key, limit)
+        if not wait:
+            return await self.app(scope, receive, send)
+
+        body = json.dumps({
+            "message": "Too many attempts, please try again later."
+        }).encode()
+        await send({"type": "http.response.start", "status": 429,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", str(math.ceil(wait)).encode())]})
+        await send({"type": "http.response.body", "body": body})
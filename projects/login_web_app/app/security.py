@@ -0,0 +1,65 @@
+import asyncio
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from .config import settings
+
+# =====================
+# Password hashing
+#
+# bcrypt is slow on purpose (~250 ms at 12 rounds). Calling it inside
+# an `async def` route would freeze the whole event loop for that
+# long, so every hash / verify runs in a small thread pool instead:
+# - bcrypt releases the GIL, so the threads really run in parallel
+#   while the event loop keeps serving other requests
+# - the pool has settings.hash_workers threads, which also caps how
+#   many hashes run at once (extra logins wait in the pool's queue)
+# =====================
+# min_rounds == max_rounds == bcrypt_rounds: any stored hash made
+# with a different cost (higher or lower) "needs update"
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    bcrypt__rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
+
+hash_pool = ThreadPoolExecutor(max_workers=settings.hash_workers,
+                               thread_name_prefix="password-hash")
+
+
+async def run_in_pool(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_pool, func, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await run_in_pool(pwd_context.hash, password)
+
+
+def _verify(password: str, stored: Optional[str]) -> Tuple[bool,
+                                                           Optional[str]]:
+    if stored is None:
+        # unknown email: still spend the time of one bcrypt check, so
+        # the response time does not reveal which emails exist
+        pwd_context.dummy_verify()
+        return False, None
+    if pwd_context.identify(stored) is None:
+        # user saved before passwords were hashed (plain text):
+        # accept it once and hand back a hash to replace it with
+        if hmac.compare_digest(stored.encode(), password.encode()):
+            return True, pwd_context.hash(password)
+        return False, None
+    return pwd_context.verify_and_update(password, stored)
+
+
+async def verify_password(password: str,
+                          stored: Optional[str]) -> Tuple[bool,
+                                                          Optional[str]]:
+    # Returns (valid, new_hash). new_hash is set when the password is
+    # valid but the stored hash should be replaced (bcrypt_rounds
+    # changed, or it was stored as plain text)
+    return await run_in_pool(_verify, password, stored)
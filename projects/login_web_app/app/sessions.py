@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel
+
+from .config import settings
+
+# =====================
+# Signed session cookies
+#
+# After login the browser gets a cookie holding
+#     base64(payload JSON) + "." + base64(HMAC-SHA256 signature)
+# The payload says who the user is and when the cookie expires, and
+# only someone who knows settings.secret_key can produce a valid
+# signature. So a page view needs no session store lookup: checking
+# the signature is enough, in any worker, on any machine sharing the
+# secret key.
+#
+# - The HMAC key is prepared once (hmac.new below) and copied for each
+#   token, instead of re-hashing the key every time
+# - Recently checked tokens are kept in a small LRU, so a user clicking
+#   around skips even the HMAC + JSON work
+# - Logging out deletes the cookie; a copy of the token stays valid
+#   until it expires (settings.session_ttl), as with any stateless token
+# =====================
+_signer = hmac.new(settings.secret_key.encode(), digestmod=hashlib.sha256)
+
+
+class SessionUser(BaseModel):
+    email: str
+    name: str
+    exp: int      # unix time the session expires at
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    mac = _signer.copy()
+    mac.update(payload.encode())
+    return _b64encode(mac.digest())
+
+
+def create_session(email: str, name: str) -> str:
+    """Signed token for the given user, valid for settings.session_ttl"""
+    session = SessionUser(email=email, name=name,
+                          exp=int(time.time()) + settings.session_ttl)
+    payload = _b64encode(session.model_dump_json().encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+# token -> SessionUser, most recently used last
+_validated: "OrderedDict[str, SessionUser]" = OrderedDict()
+_validated_lock = threading.Lock()
+
+
+def read_session(token: Optional[str]) -> Optional[SessionUser]:
+    """The session in the token, or None if it is missing/forged/expired"""
+    if not token:
+        return None
+    now = time.time()
+    with _validated_lock:
+        session = _validated.get(token)
+        if session is not None:
+            if session.exp > now:
+                _validated.move_to_end(token)
+                return session
+            del _validated[token]
+            return None
+
+    payload, _, signature = token.partition(".")
+    # compare_digest takes the same time wherever the values differ;
+    # it only accepts ASCII str, so compare bytes (a cookie may hold
+    # anything the client sent)
+    try:
+        if not hmac.compare_digest(signature.encode(),
+                                   _sign(payload).encode()):
+            return None
+    except UnicodeError:
+        return None
+    try:
+        session = SessionUser.model_validate(
+            json.loads(_b64decode(payload)))
+    except ValueError:
+        return None
+    if session.exp <= now:
+        return None
+
+    with _validated_lock:
+        _validated[token] = session
+        if len(_validated) > settings.session_cache_size:
+            _validated.popitem(last=False)   # least recently used
+    return session
+
+
+def forget_session(token: Optional[str]) -> None:
+    """Drop a token from the LRU (on logout)"""
+    with _validated_lock:
+        _validated.pop(token, None)
+
+
+# =====================
+# Dependency: the logged-in user, or a redirect to the login page
+# =====================
+def current_user(request: Request) -> SessionUser:
+    session = read_session(request.cookies.get(settings.session_cookie))
+    if session is None:
+        raise HTTPException(status_code=303, detail="Not logged in",
+                            headers={"Location": "/login"})
+    return session
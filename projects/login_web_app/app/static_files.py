@@ -0,0 +1,99 @@
+import json
+import mimetypes
+import os
+from typing import Dict, Set
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from .compression import accepted_encodings
+from .config import settings
+
+# =====================
+# Static files
+#
+# build_static.py copies static/ to settings.static_build_dir with the
+# content hash in every file name, plus .gz/.br compressed copies, and
+# a manifest.json mapping "style.css" -> "style.3f9c2a1b7d04.css".
+#
+# When that manifest exists:
+# - static_url("style.css") (usable in every template) gives the
+#   fingerprinted URL
+# - a fingerprinted file never changes (new content = new name), so
+#   browsers may cache it for a year without asking again
+# - the .br or .gz copy is sent when the browser accepts it, so
+#   nothing is compressed while serving
+# Without a build, static/ is served as before and static_url returns
+# the plain URL.
+# =====================
+MANIFEST = "manifest.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# preferred first
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+def load_manifest(directory: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+manifest = load_manifest(settings.static_build_dir)
+
+
+def static_url(name: str) -> str:
+    return "/static/" + manifest.get(name, name)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Serves a build directory with immutable caching and .br/.gz copies"""
+
+    def __init__(self, *, directory: str, fingerprinted: Set[str]):
+        super().__init__(directory=directory)
+        # full paths of the built files, and which compressed copies
+        # each one has (looked up once, not per request)
+        self.fingerprinted = {os.path.realpath(os.path.join(directory, name))
+                              for name in fingerprinted}
+        self.compressed: Dict[str, Dict[str, str]] = {}
+        for path in self.fingerprinted:
+            self.compressed[path] = {
+                encoding: path + suffix for encoding, suffix in ENCODINGS
+                if os.path.exists(path + suffix)}
+
+    def file_response(self, full_path, stat_result, scope,
+                      status_code: int = 200) -> Response:
+        full_path = os.path.realpath(full_path)
+        if full_path not in self.fingerprinted:
+            return super().file_response(full_path, stat_result, scope,
+                                         status_code)
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(
+            request_headers.get("accept-encoding", ""))
+        headers = {"Cache-Control": IMMUTABLE, "Vary": "Accept-Encoding"}
+        path = full_path
+        for encoding, variant in self.compressed[full_path].items():
+            if encoding in accepted:
+                path = variant
+                stat_result = os.stat(variant)
+                headers["Content-Encoding"] = encoding
+                break
+        response = FileResponse(
+            path, status_code=status_code, stat_result=stat_result,
+            headers=headers,
+            # the type of the original file, not of the .br/.gz copy
+            media_type=mimetypes.guess_type(full_path)[0] or "text/plain")
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def static_files() -> StaticFiles:
+    """The app mounted at /static"""
+    if manifest:
+        return PrecompressedStaticFiles(directory=settings.static_build_dir,
+                                        fingerprinted=set(manifest.values()))
+    return StaticFiles(directory="static")
@@ -0,0 +1,54 @@
+from typing import Any, Dict, Tuple
+
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, \
+    select_autoescape
+
+from .config import settings
+from .static_files import static_url
+
+# =====================
+# One template environment for the whole app (main.py and auth.py)
+#
+# - Compiled templates are kept in memory by the environment, and also
+#   on disk (bytecode cache), so a restarted worker skips the Jinja
+#   compile step. settings.template_cache_dir picks the folder
+#   (empty: the system temp folder)
+# - auto_reload (checking the .html files for changes on every render)
+#   is only on in debug mode
+# =====================
+environment = Environment(
+    loader=FileSystemLoader("templates"),
+    autoescape=select_autoescape(),
+    bytecode_cache=FileSystemBytecodeCache(
+        settings.template_cache_dir or None),
+    auto_reload=settings.debug,
+)
+
+# {{ static_url("style.css") }} -> fingerprinted URL (static_files.py)
+environment.globals["static_url"] = static_url
+
+templates = Jinja2Templates(env=environment)
+
+
+# =====================
+# Pre-rendered pages
+#
+# Pages whose HTML only depends on constant values (the home page, the
+# empty login/signup forms) are rendered once and the bytes reused for
+# every GET. In debug mode they are rendered every time, so template
+# edits still show up.
+# =====================
+_pages: Dict[Tuple[Any, ...], bytes] = {}
+
+
+def cached_page(name: str, **context: Any) -> HTMLResponse:
+    # context values must be hashable constants (not the request)
+    key = (name, *sorted(context.items()))
+    body = _pages.get(key)
+    if body is None:
+        body = environment.get_template(name).render(context).encode()
+        if not settings.debug:
+            _pages[key] = body
+    return HTMLResponse(body)
@@ -0,0 +1,99 @@
+"""
+Login throughput benchmark for the login web app.
+
+Signs up --users users, then sends --logins concurrent logins in-process
+and, at the same time, measures how late a 10 ms heartbeat on the event
+loop wakes up. It runs twice: with bcrypt in the hashing thread pool
+(security.py) and with bcrypt called straight in the route ("inline",
+what a plain `pwd_context.verify` in `async def login` would do).
+
+Run it from the login_web_app folder (the app needs static/ and
+templates/); the bcrypt settings come from the environment as usual:
+
+    BCRYPT_ROUNDS=12 HASH_WORKERS=4 python bench_login.py --logins 64
+
+Every request comes from the same client, so the per-client rate
+limits on POST /login and /signup (app/rate_limit.py) are raised for
+the benchmark; with the normal limits most logins would be 429s.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+# before the app reads its settings
+os.environ["LOGIN_RATE_LIMIT"] = "1000000/second"
+os.environ["SIGNUP_RATE_LIMIT"] = "1000000/second"
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+
+from app import security  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+
+HEARTBEAT = 0.01
+
+
+async def heartbeat(lags, stop):
+    """Sleeps HEARTBEAT seconds over and over, recording how late it wakes"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lags.append(time.perf_counter() - start - HEARTBEAT)
+
+
+async def run(http, users, logins):
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(
+        http.post("/login", data={"email": f"user{i % users}@example.com",
+                                  "password": "correct horse"})
+        for i in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    ok = sum(r.status_code == 303 for r in responses)
+    return elapsed, ok, lags
+
+
+async def inline(func, *args):
+    # what the route would do without the pool: block the loop
+    return func(*args)
+
+
+async def main(users, logins):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport,
+                                 base_url="http://bench") as http:
+        await asyncio.gather(*(
+            http.post("/signup", data={"fname": "Bench", "lname": str(i),
+                                       "email": f"user{i}@example.com",
+                                       "mobile": "0123456789",
+                                       "password": "correct horse"})
+            for i in range(users)))
+
+        print(f"bcrypt rounds {settings.bcrypt_rounds}, "
+              f"{settings.hash_workers} hash workers, "
+              f"{logins} concurrent logins")
+        pooled = security.run_in_pool
+        for mode in ("pool", "inline"):
+            security.run_in_pool = pooled if mode == "pool" else inline
+            elapsed, ok, lags = await run(http, users, logins)
+            lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+            print(f"{mode:>6}: {logins / elapsed:7.1f} logins/s "
+                  f"({ok}/{logins} ok) | heartbeats {len(lags):4d}, "
+                  f"loop lag median {statistics.median(lags_ms):7.1f} ms, "
+                  f"max {lags_ms[-1]:7.1f} ms")
+        security.run_in_pool = pooled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.logins))
@@ -0,0 +1,88 @@
+"""
+Static asset build step for the login web app.
+
+Copies every file in static/ to static_build/ under a fingerprinted name
+(style.css -> style.3f9c2a1b7d04.css, from a hash of its content), writes
+gzip (.gz) and brotli (.br) versions next to it, and records the names
+in static_build/manifest.json. The app serves static_build/ when it finds
+a manifest (app/static_files.py); run this again after editing a file:
+
+    python build_static.py
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:     # optional: without it only .gz files are written
+    brotli = None
+
+MANIFEST = "manifest.json"
+
+# formats that are compressed already, compressing them again only
+# costs time
+COMPRESSED = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif",
+              ".woff", ".woff2", ".gz", ".br", ".zip"}
+
+
+def fingerprint(name, content):
+    """style.css -> style.<12 hex digits of sha256>.css"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def variants(content):
+    """The compressed versions worth keeping (smaller than the original)"""
+    found = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        found[".br"] = brotli.compress(content, quality=11)
+    return {suffix: data for suffix, data in found.items()
+            if len(data) < len(content)}
+
+
+def build(source, target):
+    manifest = {}
+    for folder, _, files in os.walk(source):
+        for file in sorted(files):
+            path = os.path.join(folder, file)
+            # manifest keys use "/" like URLs: "css/site.css"
+            name = os.path.relpath(path, source).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                content = f.read()
+            built = fingerprint(name, content)
+            manifest[name] = built
+
+            out = os.path.join(target, built)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            outputs = {"": content}
+            if os.path.splitext(file)[1].lower() not in COMPRESSED:
+                outputs.update(variants(content))
+            for suffix, data in outputs.items():
+                with open(out + suffix, "wb") as f:
+                    f.write(data)
+            # and under the plain name, for links that do not use
+            # static_url (served without the long caching)
+            with open(os.path.join(target, name), "wb") as f:
+                f.write(content)
+            print(f"{name} -> {built} "
+                  f"({', '.join(s or 'plain' for s in outputs)})")
+
+    # the manifest is written last (and atomically), so the app never
+    # sees names whose files are not there yet; files from older builds
+    # are kept for pages that still link to them
+    tmp = os.path.join(target, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(target, MANIFEST))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default="static")
+    parser.add_argument("--target", default="static_build")
+    args = parser.parse_args()
+    build(args.source, args.target)
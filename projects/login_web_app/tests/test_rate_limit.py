@@ -0,0 +1,90 @@
+# Run from the login_web_app folder:  python -m pytest tests
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.rate_limit import RateLimit, RateLimitMiddleware, \
+    SQLiteBuckets  # noqa: E402
+
+
+def make_client(backend, tmp_path, limit):
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware,
+                       limits={("POST", "/login"): limit},
+                       backend=backend,
+                       path=str(tmp_path / "rate_limits.db"))
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_burst_then_429_with_retry_after(backend, tmp_path):
+    client = make_client(backend, tmp_path, RateLimit.parse("3/minute"))
+    assert [client.post("/login").status_code for _ in range(3)] == \
+        [200, 200, 200]
+    response = client.post("/login")
+    assert response.status_code == 429
+    # one token every 20 seconds
+    assert 1 <= int(response.headers["retry-after"]) <= 20
+    # other routes are not limited
+    assert client.get("/docs").status_code == 200
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_bucket_refills(backend, tmp_path):
+    # 2 at once, then one every 0.1 s
+    client = make_client(backend, tmp_path, RateLimit(2, 0.2))
+    assert client.post("/login").status_code == 200
+    assert client.post("/login").status_code == 200
+    assert client.post("/login").status_code == 429
+    time.sleep(0.15)
+    assert client.post("/login").status_code == 200
+    assert client.post("/login").status_code == 429
+
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path):
+    limit = RateLimit.parse("2/minute")
+    first = make_client("sqlite", tmp_path, limit)
+    second = make_client("sqlite", tmp_path, limit)
+    assert first.post("/login").status_code == 200
+    assert second.post("/login").status_code == 200
+    assert first.post("/login").status_code == 429
+
+
+def test_locked_file_does_not_block_the_event_loop(tmp_path):
+    path = tmp_path / "rate_limits.db"
+    buckets = SQLiteBuckets(str(path), busy_timeout=0.3)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")     # another worker holds the lock
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        wait = await buckets.take("k", RateLimit.parse("5/minute"))
+        ticking.cancel()
+        return wait, ticks
+
+    wait, ticks = asyncio.run(run())
+    assert wait > 0          # refused while the file stays locked
+    assert ticks >= 10       # and the loop kept running meanwhile
+    other.execute("ROLLBACK")
+    assert asyncio.run(buckets.take("k", RateLimit.parse("5/minute"))) == 0
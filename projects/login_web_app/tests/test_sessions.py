@@ -0,0 +1,42 @@
+# Run from the login_web_app folder:  python -m pytest tests
+import os
+import sys
+
+PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT)
+os.chdir(PROJECT)       # the app serves static/ and templates/ from here
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import sessions  # noqa: E402
+from app.main import app  # noqa: E402
+
+client = TestClient(app)
+
+
+def test_valid_session_round_trip():
+    token = sessions.create_session("ada@example.com", "Ada Lovelace")
+    session = sessions.read_session(token)
+    assert session.email == "ada@example.com"
+    assert session.name == "Ada Lovelace"
+
+
+def test_non_ascii_tokens_are_rejected():
+    for token in ["é.é", "abc.ÿþ", "\udcff.x", "\x00\x01.\x02"]:
+        assert sessions.read_session(token) is None
+
+
+def test_forged_signature_is_rejected():
+    token = sessions.create_session("ada@example.com", "Ada Lovelace")
+    payload, _, _ = token.partition(".")
+    assert sessions.read_session(payload + ".AAAA") is None
+
+
+def test_dashboard_with_garbage_cookie_redirects_to_login():
+    for cookie in [b"session=\xe9\xe8.\xff", b"session=\xff\xfe\xfd",
+                   b"session=not-a-token"]:
+        response = client.get("/dashboard", headers={"cookie": cookie},
+                              follow_redirects=False)
+        assert response.status_code == 303
+        assert response.headers["location"] == "/login"
@@ -0,0 +1,579 @@
+from datetime import datetime
+from typing import (Any, Callable, Dict, Iterable, Iterator, List,
+                    NamedTuple, Optional, Set, Tuple)
+import bisect
+import heapq
+from uuid import UUID
+
+# Longest n-gram kept in the substring indexes. Needles up to this
+# length are answered straight from one posting set, longer ones by
+# intersecting their trigrams and then checking the real value.
+GRAM_SIZE = 3
+
+# Fields that support substring search
+TEXT_FIELDS = ("first_name", "last_name", "email")
+
+# Fields with a pre-sorted ordering maintained on every write
+SORT_FIELDS = ("first_name", "last_name", "email", "age")
+
+
+def _indexed_text(field: str, student: Any) -> str:
+    text = getattr(student, field) or ""
+    if field == "email":
+        # only the part before the "@": every student shares the same
+        # domain, so its grams would be postings holding the whole
+        # roster (the domain has an index of its own)
+        text = text.partition("@")[0]
+    return text
+
+
+def _grams(text: str) -> Set[str]:
+    text = text.lower()
+    return {text[i:i + n]
+            for n in range(1, GRAM_SIZE + 1)
+            for i in range(len(text) - n + 1)}
+
+
+# =====================
+# In-memory student repository
+# - UUID -> student hash index for O(1) lookups
+# - Separate active set so soft-deleted rows are never rescanned
+# - Email index + per "first.last" suffix counters so unique
+#   addresses are handed out without scanning the roster
+# - Secondary indexes over active students for /students/search:
+#   gender buckets, a sorted age index and n-gram indexes
+# - Pre-sorted orderings per sortable field for top-k selection
+#   and keyset (cursor) pagination
+# =====================
+class StudentRepository:
+    def __init__(self, students: Iterable[Any] = (),
+                 email_domain: str = "student-university.co.uk"):
+        self.email_domain = email_domain
+        # every student ever added (soft-deleted ones included)
+        self._by_id: Dict[UUID, Any] = {}
+        # ids of active students; a dict keeps insertion order
+        # so listings come back in the order students were added
+        self._active: Dict[UUID, None] = {}
+        # email -> owner id; soft-deleted students keep their address
+        self._emails: Dict[str, UUID] = {}
+        # "first.last" -> lowest suffix never skipped past yet
+        self._next_suffix: Dict[str, int] = {}
+        # "first.last" -> min-heap of suffixes given back by renames
+        self._free_suffixes: Dict[str, List[int]] = {}
+        # email -> ("first.last", suffix) for generated addresses
+        self._email_slots: Dict[str, Tuple[str, int]] = {}
+        # insertion position, used to return unsorted results in order
+        self._position: Dict[UUID, int] = {}
+        # gender -> ids of active students
+        self._gender: Dict[Any, Set[UUID]] = {}
+        # field -> sorted (sort key, position, id) entries of active
+        # students; position breaks ties in insertion order. The age
+        # ordering doubles as the index for age range queries.
+        self._orderings: Dict[str, List[Tuple[Any, int, UUID]]] = {
+            field: [] for field in SORT_FIELDS}
+        # field -> n-gram -> ids of active students containing it
+        # (for email: n-grams of the part before the "@")
+        self._grams: Dict[str, Dict[str, Set[UUID]]] = {
+            field: {} for field in TEXT_FIELDS}
+        # email domain -> ids of active students with that domain
+        self._domains: Dict[str, Set[UUID]] = {}
+        # bumped by every write; the API builds ETags from it
+        self.version = 0
+        for student in students:
+            self.add(student)
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def __iter__(self) -> Iterator[Any]:
+        # all students, active or not
+        return iter(self._by_id.values())
+
+    def active(self) -> Iterator[Any]:
+        for student_id in self._active:
+            yield self._by_id[student_id]
+
+    def get(self, student_id: UUID) -> Optional[Any]:
+        # only active students are visible to the API
+        if student_id not in self._active:
+            return None
+        return self._by_id[student_id]
+
+    def add(self, student: Any) -> Any:
+        self._by_id[student.id] = student
+        self._position.setdefault(student.id, len(self._position))
+        self._emails[student.email] = student.id
+        self._remember_slot(student)
+        if student.is_active:
+            self._active[student.id] = None
+            self._index(student)
+        self.version += 1
+        return student
+
+    def update(self, student_id: UUID,
+               changes: Dict[str, Any]) -> Optional[Any]:
+        student = self.get(student_id)
+        if student is None:
+            return None
+        self._unindex(student)
+        for key, value in changes.items():
+            setattr(student, key, value)
+        student.updated_at = datetime.now()
+        self._index(student)
+        self.version += 1
+        return student
+
+    def soft_delete(self, student_id: UUID) -> Optional[Any]:
+        student = self.get(student_id)
+        if student is None:
+            return None
+        self._unindex(student)
+        student.is_active = False
+        student.updated_at = datetime.now()
+        del self._active[student_id]
+        self.version += 1
+        return student
+
+    def put(self, student: Any) -> Any:
+        # Insert or replace a whole record as-is (no timestamps
+        # touched, no email allocation). Used to replay a log.
+        old = self._by_id.get(student.id)
+        if old is None:
+            return self.add(student)
+        was_active = student.id in self._active
+        if was_active:
+            self._unindex(old)
+        if old.email != student.email:
+            if self._emails.get(old.email) == old.id:
+                del self._emails[old.email]
+            slot = self._email_slots.get(old.email)
+            if slot is not None:
+                base, suffix = slot
+                heapq.heappush(self._free_suffixes.setdefault(base, []),
+                               suffix)
+        self._by_id[student.id] = student
+        self._emails[student.email] = student.id
+        self._remember_slot(student)
+        if student.is_active:
+            # keeps its listing position if it was already active
+            self._active.setdefault(student.id, None)
+            self._index(student)
+        elif was_active:
+            del self._active[student.id]
+        self.version += 1
+        return student
+
+    # =====================
+    # Secondary index maintenance
+    # Only active students are indexed
+    # =====================
+    def _index(self, student: Any) -> None:
+        self._gender.setdefault(student.gender, set()).add(student.id)
+        for field in SORT_FIELDS:
+            entry = self._entry(field, student)
+            if entry is not None:
+                bisect.insort(self._orderings[field], entry)
+        for field in TEXT_FIELDS:
+            postings = self._grams[field]
+            for gram in _grams(_indexed_text(field, student)):
+                postings.setdefault(gram, set()).add(student.id)
+        self._domains.setdefault(self._domain(student), set()).add(
+            student.id)
+
+    def _unindex(self, student: Any) -> None:
+        bucket = self._gender.get(student.gender)
+        if bucket is not None:
+            bucket.discard(student.id)
+        for field in SORT_FIELDS:
+            entry = self._entry(field, student)
+            ordering = self._orderings[field]
+            if entry is not None:
+                i = bisect.bisect_left(ordering, entry)
+                if i < len(ordering) and ordering[i] == entry:
+                    del ordering[i]
+        for field in TEXT_FIELDS:
+            postings = self._grams[field]
+            for gram in _grams(_indexed_text(field, student)):
+                ids = postings.get(gram)
+                if ids is not None:
+                    ids.discard(student.id)
+                    if not ids:
+                        del postings[gram]
+        domain = self._domain(student)
+        ids = self._domains.get(domain)
+        if ids is not None:
+            ids.discard(student.id)
+            if not ids:
+                del self._domains[domain]
+
+    @staticmethod
+    def _domain(student: Any) -> str:
+        return (student.email or "").lower().partition("@")[2]
+
+    def _entry(self, field: str,
+               student: Any) -> Optional[Tuple[Any, int, UUID]]:
+        value = getattr(student, field)
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = value.lower()
+        return (value, self._position[student.id], student.id)
+
+    # =====================
+    # Email allocation
+    # Suffix 1 is the bare "first.last" address, then
+    # first.last2, first.last3, ... exactly as before
+    # =====================
+    def _address(self, base: str, suffix: int) -> str:
+        if suffix == 1:
+            return f"{base}@{self.email_domain}"
+        return f"{base}{suffix}@{self.email_domain}"
+
+    def _remember_slot(self, student: Any) -> None:
+        # students added with a ready-made address (seed data)
+        # still get their suffix recorded so renames can reuse it
+        if student.email in self._email_slots:
+            return
+        local, _, domain = student.email.partition("@")
+        base = (f"{student.first_name.lower().strip()}."
+                f"{student.last_name.lower().strip()}")
+        if domain != self.email_domain or not local.startswith(base):
+            return
+        rest = local[len(base):]
+        if not rest:
+            self._email_slots[student.email] = (base, 1)
+        elif rest.isdigit():
+            self._email_slots[student.email] = (base, int(rest))
+
+    def _email_free(self, email: str, exclude_id: Optional[UUID]) -> bool:
+        owner = self._emails.get(email)
+        return owner is None or owner == exclude_id
+
+    def allocate_email(self, first_name: str, last_name: str,
+                       exclude_id: Optional[UUID] = None) -> str:
+        base = f"{first_name}.{last_name}"
+
+        # A student being renamed may keep its own address
+        own = None
+        if exclude_id is not None and exclude_id in self._by_id:
+            slot = self._email_slots.get(self._by_id[exclude_id].email)
+            if slot is not None and slot[0] == base:
+                own = slot[1]
+
+        # Reuse the lowest suffix released by a rename, if still free
+        free = self._free_suffixes.get(base)
+        while free:
+            email = self._address(base, free[0])
+            if self._email_free(email, exclude_id):
+                break
+            heapq.heappop(free)
+        if free and (own is None or free[0] < own):
+            self._email_slots[email] = (base, free[0])
+            return email
+        if own is not None:
+            return self._address(base, own)
+
+        # Otherwise continue from the counter; it only moves
+        # forward, so the loop is amortised O(1) per address
+        suffix = self._next_suffix.get(base, 1)
+        email = self._address(base, suffix)
+        while not self._email_free(email, exclude_id):
+            suffix += 1
+            email = self._address(base, suffix)
+        self._next_suffix[base] = suffix
+        self._email_slots[email] = (base, suffix)
+        return email
+
+    def set_email(self, student_id: UUID, email: str) -> Optional[Any]:
+        student = self.get(student_id)
+        if student is None:
+            return None
+        if email != student.email:
+            # release the old address so its suffix can be reused
+            del self._emails[student.email]
+            slot = self._email_slots.get(student.email)
+            if slot is not None:
+                base, suffix = slot
+                heapq.heappush(self._free_suffixes.setdefault(base, []),
+                               suffix)
+            self._unindex(student)
+            student.email = email
+            self._emails[email] = student_id
+            self._index(student)
+            self.version += 1
+        return student
+
+    # =====================
+    # Search planner
+    # Every filter becomes a candidate source with a size estimate.
+    # The most selective one drives the query, the other set-backed
+    # sources are intersected with it and anything left over is
+    # checked per candidate.
+    # =====================
+    def search(self, **filters: Any) -> List[Any]:
+        return self._run(self._sources(**filters))
+
+    def _sources(self,
+                 first_name: Optional[str] = None,
+                 last_name: Optional[str] = None,
+                 email: Optional[str] = None,
+                 gender: Any = None,
+                 min_age: Optional[int] = None,
+                 max_age: Optional[int] = None) -> List["_Source"]:
+        sources: List[_Source] = []
+        for field, needle in (("first_name", first_name),
+                              ("last_name", last_name),
+                              ("email", email)):
+            if needle:
+                sources.append(self._substring_source(field, needle))
+        if gender:
+            sources.append(self._gender_source(gender))
+        if min_age is not None or max_age is not None:
+            sources.append(self._age_source(min_age, max_age))
+        sources.sort(key=lambda source: source.size)
+        return sources
+
+    def _run(self, sources: List["_Source"]) -> List[Any]:
+        # matches in insertion order
+        if not sources:
+            return list(self.active())
+        results = self._matches(sources)
+        results.sort(key=lambda student: self._position[student.id])
+        return results
+
+    def _matches(self, sources: List["_Source"]) -> List[Any]:
+        # matches in no particular order (callers that pick a top-k
+        # with a heap do not pay for a sort)
+        if not sources:
+            return list(self.active())
+
+        driver = sources[0]
+        candidates = set(driver.ids())
+        checks = [] if driver.exact else [driver.check]
+        for source in sources[1:]:
+            if source.set_backed:
+                candidates &= source.ids()
+                if not source.exact:
+                    checks.append(source.check)
+            else:
+                checks.append(source.check)
+
+        results = [self._by_id[student_id] for student_id in candidates]
+        for check in checks:
+            results = [student for student in results if check(student)]
+        return results
+
+    # =====================
+    # Sorted, paginated search
+    # - Selective filters: materialise the matches and keep only
+    #   the top skip+limit with a heap instead of a full sort
+    # - Broad filters: walk the pre-sorted ordering and stop as
+    #   soon as the page is full
+    # - after: (sort key, position) of the last row already seen;
+    #   the walk starts right after it with one bisect
+    # Returns the page and the (sort key, position) of its last row.
+    # =====================
+    def page(self,
+             sort_by: Optional[str],
+             descending: bool = False,
+             skip: int = 0,
+             limit: int = 10,
+             after: Optional[Tuple[Any, int]] = None,
+             **filters: Any) -> Tuple[List[Any], Optional[Tuple[Any, int]]]:
+        sources = self._sources(**filters)
+        if sort_by not in self._orderings:
+            # unsorted: insertion order, offset pagination only
+            return self._run(sources)[skip:skip + limit], None
+
+        want = skip + limit
+        total = len(self._active)
+        estimate = sources[0].size if sources else total
+        if sources and want * total >= estimate * estimate:
+            # walking would visit about want * total / estimate rows,
+            # materialising costs about estimate; pick the cheaper
+            entries = [self._entry(sort_by, student)
+                       for student in self._matches(sources)]
+            entries = [entry for entry in entries if entry is not None
+                       and self._after(entry, after, descending)]
+            if descending:
+                # ties keep insertion order, as in a stable sort
+                top = heapq.nlargest(want, entries,
+                                     key=lambda e: (e[0], -e[1]))
+            else:
+                top = heapq.nsmallest(want, entries)
+        else:
+            checks = [source.check for source in sources]
+            top = []
+            for entry in self._walk(sort_by, descending, after):
+                student = self._by_id[entry[2]]
+                if all(check(student) for check in checks):
+                    top.append(entry)
+                    if len(top) == want:
+                        break
+
+        rows = top[skip:]
+        last = rows[-1][:2] if rows else None
+        return [self._by_id[entry[2]] for entry in rows], last
+
+    @staticmethod
+    def _after(entry: Tuple[Any, int, UUID],
+               after: Optional[Tuple[Any, int]],
+               descending: bool) -> bool:
+        if after is None:
+            return True
+        if descending:
+            # keys descending, ties in insertion order
+            return entry[0] < after[0] or \
+                (entry[0] == after[0] and entry[1] > after[1])
+        return entry[:2] > after
+
+    def _walk(self, field: str, descending: bool,
+              after: Optional[Tuple[Any, int]]) -> Iterator[Tuple]:
+        ordering = self._orderings[field]
+        if descending:
+            # keys from the end backwards, but each run of equal keys
+            # forwards, so ties keep insertion order
+            end = len(ordering)
+            if after is not None:
+                # rest of the cursor's run, then the smaller keys
+                yield from ordering[
+                    bisect.bisect_left(ordering, (after[0], after[1] + 1)):
+                    bisect.bisect_left(ordering, (after[0], float("inf")))]
+                end = bisect.bisect_left(ordering, (after[0],))
+            while end > 0:
+                start = bisect.bisect_left(ordering, (ordering[end - 1][0],),
+                                           0, end)
+                yield from ordering[start:end]
+                end = start
+        else:
+            start = 0
+            if after is not None:
+                # positions are unique, so (key, position + 1) is the
+                # first possible entry after the cursor
+                start = bisect.bisect_left(ordering,
+                                           (after[0], after[1] + 1))
+            for i in range(start, len(ordering)):
+                yield ordering[i]
+
+    def _substring_source(self, field: str, needle: str) -> "_Source":
+        needle = needle.lower()
+
+        def check(student: Any) -> bool:
+            return needle in (getattr(student, field) or "").lower()
+
+        if field == "email":
+            return self._email_source(needle, check)
+        return self._gram_source(field, needle, check)
+
+    def _gram_source(self, field: str, needle: str,
+                     check: Callable[[Any], bool]) -> "_Source":
+        # students whose indexed text contains the needle
+        postings = self._grams[field]
+        if len(needle) <= GRAM_SIZE:
+            # the posting set for the needle itself is exact
+            ids = postings.get(needle, set())
+            return _Source(len(ids), lambda: ids, True, True, check)
+
+        # longer needles: every trigram must be present, then the
+        # real substring is confirmed on whatever survives
+        parts = sorted((postings.get(needle[i:i + GRAM_SIZE], set())
+                        for i in range(len(needle) - GRAM_SIZE + 1)),
+                       key=len)
+
+        def ids() -> Set[UUID]:
+            result = set(parts[0])
+            for part in parts[1:]:
+                if not result:
+                    break
+                result &= part
+            return result
+
+        # when not driving, the substring check alone is cheaper than
+        # copying a (possibly large) trigram posting set
+        return _Source(len(parts[0]), ids, False, False, check)
+
+    def _email_source(self, needle: str,
+                      check: Callable[[Any], bool]) -> "_Source":
+        # Only the part before the "@" has n-grams; domains are matched
+        # against the (few) distinct domains instead
+        local, at, domain = needle.partition("@")
+        if not at:
+            # the match is inside the local part or inside the domain
+            source = self._gram_source("email", needle, check)
+            domains = [ids for name, ids in self._domains.items()
+                       if needle in name]
+            if not domains:
+                return source
+
+            def either() -> Set[UUID]:
+                result = set(source.ids())
+                for ids in domains:
+                    result |= ids
+                return result
+
+            return _Source(source.size + sum(map(len, domains)), either,
+                           source.exact, False, check)
+
+        # "...ith@stud...": the local part ends with `local`, the
+        # domain starts with `domain`
+        domains = [ids for name, ids in self._domains.items()
+                   if name.startswith(domain)]
+        size = sum(map(len, domains))
+        if local:
+            source = self._gram_source("email", local, check)
+            size = min(size, source.size)
+
+        def both() -> Set[UUID]:
+            result: Set[UUID] = set()
+            for ids in domains:
+                result |= ids
+            if local and result:
+                result &= source.ids()
+            return result
+
+        # with a local part, "ends with" still has to be checked
+        return _Source(size, both, not local, False, check)
+
+    def _gender_source(self, gender: Any) -> "_Source":
+        ids = self._gender.get(gender, set())
+        return _Source(len(ids), lambda: ids, True, True,
+                       lambda student: student.gender == gender)
+
+    def _age_source(self, min_age: Optional[int],
+                    max_age: Optional[int]) -> "_Source":
+        ages = self._orderings["age"]
+        lo = 0
+        hi = len(ages)
+        if min_age is not None:
+            lo = bisect.bisect_left(ages, (min_age,))
+        if max_age is not None:
+            hi = bisect.bisect_left(ages, (max_age + 1,))
+
+        def ids() -> Set[UUID]:
+            return {entry[2] for entry in ages[lo:hi]}
+
+        def check(student: Any) -> bool:
+            if student.age is None:
+                return False
+            if min_age is not None and student.age < min_age:
+                return False
+            return max_age is None or student.age <= max_age
+
+        # the range is only materialised when it drives the query
+        return _Source(max(hi - lo, 0), ids, True, False, check)
+
+
+# =====================
+# One candidate source considered by the search planner
+# - size: how many ids it would produce
+# - ids: builds the candidate id set
+# - exact: ids need no further check
+# - set_backed: ids() is a ready-made set, cheap to intersect with
+# - check: per-student predicate used when not intersecting
+# =====================
+class _Source(NamedTuple):
+    size: int
+    ids: Callable[[], Set[UUID]]
+    exact: bool
+    set_backed: bool
+    check: Callable[[Any], bool]
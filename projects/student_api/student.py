@@ -1,12 +1,39 @@
-from fastapi import FastAPI, HTTPException, status, Query
-from pydantic import BaseModel, Field, EmailStr, conint, constr
+from fastapi import FastAPI, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter, conint, constr
 from typing import List, Optional, Annotated
+from contextlib import asynccontextmanager, nullcontext
 from uuid import uuid4, UUID
 from datetime import datetime
 from enum import Enum
+import base64
+import binascii
+import json
+import os
 import re
 
-app = FastAPI()
+from compression import CompressionMiddleware
+from repository import SORT_FIELDS, StudentRepository
+from shared_state import STATE_BACKEND, open_store
+from wal import WriteAheadLog
+
+
+# =====================
+# App lifespan
+# Flushes the write-ahead log (if enabled) on shutdown
+# =====================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if WAL is not None:
+        WAL.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# gzip / brotli / zstd for responses of 1 KB and up, including the
+# streamed NDJSON list (compression.py)
+app.add_middleware(CompressionMiddleware)
 
 
 # =====================
@@ -54,8 +81,11 @@ class Student(StudentCreate):
 
 # =====================
 # In-memory storage
+# Indexed by UUID, see repository.py
 # =====================
-STUDENTS: List[Student] = [
+EMAIL_DOMAIN = "student-university.co.uk"
+
+SEED_STUDENTS = [
     Student(first_name="Alice",
             last_name="Johnson",
             age=20,
@@ -72,6 +102,66 @@ STUDENTS: List[Student] = [
 ]
 
 
+# =====================
+# Optional persistence
+# STATE_BACKEND=sqlite (see shared_state.py): students
+# are stored in a SQLite file (STATE_PATH) shared by
+# every uvicorn worker. Each worker keeps STUDENTS and
+# its indexes in memory and applies the other workers'
+# writes before handling a request.
+# STUDENT_WAL_DIR=<dir> (see wal.py, single process):
+# every write is appended to a log there, fsynced in
+# batches every STUDENT_WAL_FLUSH_MS, and compacted
+# into a snapshot every STUDENT_WAL_SNAPSHOT_EVERY
+# writes. On startup the snapshot + log tail are
+# replayed into STUDENTS.
+# Without either, students live in memory only.
+# =====================
+WAL_DIR = os.getenv("STUDENT_WAL_DIR")
+SHARED = None
+WAL = None
+
+if STATE_BACKEND == "sqlite":
+    SHARED = open_store("students",
+                        encode=Student.model_dump_json,
+                        decode=Student.model_validate_json)
+    SHARED.seed({str(s.id): s for s in SEED_STUDENTS})
+    STUDENTS = StudentRepository(SHARED.values(), email_domain=EMAIL_DOMAIN)
+    SHARED.on_change(lambda key, student: student and STUDENTS.put(student))
+elif WAL_DIR:
+    STUDENTS = StudentRepository(email_domain=EMAIL_DOMAIN)
+    WAL = WriteAheadLog(
+        WAL_DIR,
+        flush_interval=float(os.getenv("STUDENT_WAL_FLUSH_MS", "10")) / 1000,
+        snapshot_every=int(os.getenv("STUDENT_WAL_SNAPSHOT_EVERY", "10000")))
+    WAL.open(STUDENTS,
+             encode=Student.model_dump_json,
+             decode=Student.model_validate,
+             seed=SEED_STUDENTS)
+else:
+    STUDENTS = StudentRepository(SEED_STUDENTS, email_domain=EMAIL_DOMAIN)
+
+
+def writing():
+    # makes a read-modify-write atomic across workers
+    return SHARED.writing() if SHARED is not None else nullcontext()
+
+
+def log_write(op: str, student: Student) -> None:
+    if SHARED is not None:
+        SHARED[str(student.id)] = student
+    if WAL is not None:
+        WAL.append(op, student)
+
+
+@app.middleware("http")
+async def sync_shared_state(request: Request, call_next):
+    # pull in students written by other workers
+    if SHARED is not None:
+        SHARED.sync()
+    return await call_next(request)
+
+
 # =====================
 # Normalize phone numbers
 # Keep '+' and digits only
@@ -85,19 +175,81 @@ def normalize_phone(phone: str) -> str:
 
 # =====================
 # Generate unique email safely
+# O(1) via the repository's email index
 # =====================
 def generate_student_email(first_name: str,
                            last_name: str,
                            exclude_id: Optional[UUID] = None) -> str:
     first_name = first_name.lower().strip()
     last_name = last_name.lower().strip()
-    base_email = f"{first_name}.{last_name}@student-university.co.uk"
-    email = base_email
-    counter = 1
-    while any(s.email == email and s.id != exclude_id for s in STUDENTS):
-        counter += 1
-        email = f"{first_name}.{last_name}{counter}@student-university.co.uk"
-    return email
+    return STUDENTS.allocate_email(first_name, last_name,
+                                   exclude_id=exclude_id)
+
+
+# =====================
+# Streaming (NDJSON) support
+# Clients sending "Accept: application/x-ndjson" get one
+# JSON object per line, emitted in batches as they are
+# serialized instead of one big validated list
+# =====================
+NDJSON = "application/x-ndjson"
+STREAM_BATCH = 500
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON in request.headers.get("accept", "")
+
+
+async def stream_students(students: List[Student]):
+    for start in range(0, len(students), STREAM_BATCH):
+        batch = students[start:start + STREAM_BATCH]
+        yield "".join(s.model_dump_json() + "\n" for s in batch)
+
+
+# =====================
+# Fast list serialization
+# The students in STUDENTS were validated when they were
+# created/updated, so re-validating them for every GET
+# is wasted work. A TypeAdapter built once for the list
+# type serializes them straight to JSON bytes, and the
+# bytes are reused until STUDENTS.version changes.
+# SERIALIZER_MODE=pydantic goes back to response_model.
+# =====================
+SERIALIZER_MODE = os.getenv("SERIALIZER_MODE", "fast").lower()
+STUDENT_LIST = TypeAdapter(List[Student])
+_students_json = (None, b"")  # (STUDENTS.version, JSON bytes)
+
+
+def students_json() -> bytes:
+    global _students_json
+    version, body = _students_json
+    if version != STUDENTS.version:
+        body = STUDENT_LIST.dump_json(list(STUDENTS.active()))
+        _students_json = (STUDENTS.version, body)
+    return body
+
+
+# =====================
+# ETags / conditional GET
+# The tag is built from STUDENTS.version (bumped by every
+# create/update/delete), so a matching If-None-Match is
+# answered with an empty 304 before any serialization.
+# BOOT_ID stops tags from a previous run matching after
+# a restart.
+# =====================
+BOOT_ID = uuid4().hex[:8]
+
+
+def students_etag(variant: str) -> str:
+    return f'"{BOOT_ID}-students-{STUDENTS.version}-{variant}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
 
 
 # =====================
@@ -112,8 +264,22 @@ async def landing_page():
 # Get all active students
 # =====================
 @app.get("/students", response_model=List[Student])
-async def get_all_students():
-    return [s for s in STUDENTS if s.is_active]
+async def get_all_students(request: Request, response: Response):
+    ndjson = wants_ndjson(request)
+    etag = students_etag("ndjson" if ndjson else "json")
+    headers = {"ETag": etag, "Vary": "Accept"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if ndjson:
+        # snapshot of references only, so writes made while
+        # the response streams cannot break the iteration
+        return StreamingResponse(stream_students(list(STUDENTS.active())),
+                                 media_type=NDJSON, headers=headers)
+    if SERIALIZER_MODE == "fast":
+        return Response(students_json(),
+                        media_type="application/json", headers=headers)
+    response.headers.update(headers)
+    return list(STUDENTS.active())
 
 
 # =====================
@@ -124,9 +290,12 @@ async def get_all_students():
           status_code=status.HTTP_201_CREATED)
 async def add_student(student: StudentCreate):
     student.phone = normalize_phone(student.phone)
-    email = generate_student_email(student.first_name, student.last_name)
-    new_student = Student(**student.model_dump(), email=email)
-    STUDENTS.append(new_student)
+    async with writing():
+        email = generate_student_email(student.first_name,
+                                       student.last_name)
+        new_student = Student(**student.model_dump(), email=email)
+        STUDENTS.add(new_student)
+        log_write("add", new_student)
     return new_student
 
 
@@ -136,20 +305,22 @@ async def add_student(student: StudentCreate):
 @app.put("/students/{student_id}",
          response_model=Student)
 async def update_student(student_id: UUID, student_update: StudentUpdate):
-    for student in STUDENTS:
-        if student.id == student_id and student.is_active:
-            update_data = student_update.model_dump(exclude_unset=True)
-            if "phone" in update_data:
-                update_data["phone"] = normalize_phone(update_data["phone"])
-            for key, value in update_data.items():
-                setattr(student, key, value)
-            if update_data.get("first_name") or update_data.get("last_name"):
-                student.email = generate_student_email(student.first_name,
-                                                       student.last_name,
-                                                       exclude_id=student.id)
-            student.updated_at = datetime.now()
-            return student
-    raise HTTPException(status_code=404, detail="Student not found")
+    update_data = student_update.model_dump(exclude_unset=True)
+    if "phone" in update_data:
+        update_data["phone"] = normalize_phone(update_data["phone"])
+    async with writing():
+        student = STUDENTS.update(student_id, update_data)
+        if student is None:
+            raise HTTPException(status_code=404,
+                                detail="Student not found")
+        if update_data.get("first_name") or update_data.get("last_name"):
+            # releases the old address and reserves the new one
+            STUDENTS.set_email(student.id,
+                               generate_student_email(student.first_name,
+                                                      student.last_name,
+                                                      exclude_id=student.id))
+        log_write("update", student)
+    return student
 
 
 # =====================
@@ -157,19 +328,52 @@ async def update_student(student_id: UUID, student_update: StudentUpdate):
 # =====================
 @app.delete("/students/{student_id}", response_model=Student)
 async def delete_student(student_id: UUID):
-    for student in STUDENTS:
-        if student.id == student_id and student.is_active:
-            student.is_active = False
-            student.updated_at = datetime.now()
-            return student
-    raise HTTPException(status_code=404, detail="Student not found")
+    async with writing():
+        student = STUDENTS.soft_delete(student_id)
+        if student is None:
+            raise HTTPException(status_code=404,
+                                detail="Student not found")
+        log_write("soft_delete", student)
+    return student
+
+
+# =====================
+# Opaque search cursors
+# Encodes where the last page ended so the next one
+# can continue with a bisect instead of an offset
+# =====================
+def encode_cursor(sort_by: str, descending: bool, last) -> str:
+    raw = json.dumps([sort_by, descending, last[0], last[1]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(token: str, sort_by: str, descending: bool):
+    try:
+        cursor_sort, cursor_desc, key, position = json.loads(
+            base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort_by or cursor_desc != descending:
+        raise HTTPException(status_code=400,
+                            detail="Cursor does not match sort order")
+    # a tampered cursor must not reach the repository's comparisons:
+    # ages are ints, the other sort keys strings (bools are ints too)
+    key_type = int if sort_by == "age" else str
+    if (type(key) is not key_type or type(position) is not int
+            or position < 0):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key, position
 
 
 # =====================
 # Search students with filters, pagination, sorting
+# - skip/limit for shallow pages
+# - after=<cursor> for deep paging; the next cursor is
+#   returned in the X-Next-Cursor header
 # =====================
 @app.get("/students/search", response_model=List[Student])
 async def search_students(
+    response: Response,
     first_name: Optional[str] = Query(None),
     last_name: Optional[str] = Query(None),
     email: Optional[str] = Query(None),
@@ -179,62 +383,64 @@ async def search_students(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     sort_by: Optional[str] = Query("first_name"),
-    sort_order: Optional[str] = Query("asc")
+    sort_order: Optional[str] = Query("asc"),
+    after: Optional[str] = Query(None)
 ):
-    results = [s for s in STUDENTS if s.is_active]
-
-    # Filtering
-    if first_name:
-        results = [
-            s for s in results if first_name.lower() in s.first_name.lower()
-        ]
-    if last_name:
-        results = [
-            s for s in results if last_name.lower() in s.last_name.lower()
-        ]
-    if email:
-        results = [
-            s for s in results if email.lower() in s.email.lower()
-        ]
-    if gender:
-        results = [
-            s for s in results if s.gender == gender
-        ]
-    if min_age is not None:
-        results = [
-            s for s in results if s.age >= min_age
-        ]
-    if max_age is not None:
-        results = [
-            s for s in results if s.age <= max_age
-        ]
-
-    # Sorting safely
-    if sort_by in {"first_name", "last_name", "email", "age"}:
-        reverse = (sort_order or "asc").lower() == "desc"
-
-        def sort_key(s):
-            val = getattr(s, sort_by)
-            return val.lower() if isinstance(val, str) else val
-
-        results.sort(key=sort_key, reverse=reverse)
-
-    # Pagination
-    paginated = results[skip: skip + limit]
+    descending = (sort_order or "asc").lower() == "desc"
+    cursor = None
+    if after:
+        if sort_by not in SORT_FIELDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cursor paging needs sort_by in {SORT_FIELDS}")
+        cursor = decode_cursor(after, sort_by, descending)
+
+    # Filtering, sorting and pagination planned over the
+    # repository's secondary indexes and pre-sorted orderings
+    paginated, last = STUDENTS.page(sort_by=sort_by,
+                                    descending=descending,
+                                    skip=skip,
+                                    limit=limit,
+                                    after=cursor,
+                                    first_name=first_name,
+                                    last_name=last_name,
+                                    email=email,
+                                    gender=gender,
+                                    min_age=min_age,
+                                    max_age=max_age)
     if not paginated:
         raise HTTPException(
             status_code=404, detail="No matching students found")
+    if last is not None and len(paginated) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            sort_by, descending, last)
     return paginated
 
 
 # =====================
 # PROJECT NOTES
 # - Soft delete via is_active
+# - Students indexed by UUID; lookups, updates and
+#   soft deletes are O(1) (see repository.py)
 # - Emails are unique; duplicates get a number appended
+#   (next free number comes from a per-name counter)
 # - Phone numbers normalized
 # - Search supports filters, pagination, sorting
+#   (filters answered from gender/age/n-gram indexes,
+#   pages picked with a heap or a walk of a pre-sorted
+#   ordering, deep pages via the X-Next-Cursor token)
 # - Update auto-refreshes email if names change
 # - UUIDs used consistently
+# - GET /students streams NDJSON when asked via Accept
+# - GET /students sends an ETag and answers a matching
+#   If-None-Match with 304 Not Modified
+# - GET /students JSON comes from a precompiled
+#   TypeAdapter, cached until the next write
+# - Optional write-ahead log + snapshots (STUDENT_WAL_DIR)
+#   so students survive a restart
+# - STATE_BACKEND=sqlite shares students between workers
+# - Responses of 1 KB+ are gzip/brotli/zstd compressed
+#   (compression.py), streamed NDJSON chunk by chunk
 #
 # exclude_unset=True
 # - Only include fields that the client actually
@@ -0,0 +1,61 @@
+# Run from the student_api folder:  python -m pytest tests
+import base64
+import json
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import student  # noqa: E402
+
+client = TestClient(student.app)
+
+
+def cursor(*parts):
+    return base64.urlsafe_b64encode(json.dumps(parts).encode()).decode()
+
+
+@pytest.mark.parametrize("sort_by, after", [
+    ("age", "garbage"),
+    ("age", cursor("age", False, "x", 1)),         # key of the wrong type
+    ("age", cursor("age", False, True, 1)),        # bools are not ages
+    ("age", cursor("age", False, 20, "1")),        # position not an int
+    ("age", cursor("age", False, 20, None)),
+    ("age", cursor("age", False, 20)),             # too short
+    ("first_name", cursor("first_name", False, 5, 1)),
+])
+def test_bad_cursor_is_a_400(sort_by, after):
+    response = client.get("/students/search",
+                          params={"sort_by": sort_by, "after": after})
+    assert response.status_code == 400
+
+
+def test_cursor_for_another_sort_order_is_a_400():
+    response = client.get("/students/search", params={
+        "sort_by": "age", "sort_order": "desc",
+        "after": cursor("age", False, 20, 0)})
+    assert response.status_code == 400
+
+
+def test_descending_pages_keep_ties_in_insertion_order():
+    names = ["Tie%d" % i for i in range(5)]
+    for name in names:
+        response = client.post("/students", json={
+            "first_name": name, "last_name": "Cursor", "age": 77,
+            "gender": "Other", "phone": "+1234567890"})
+        assert response.status_code == 201
+    params = {"sort_by": "age", "sort_order": "desc", "min_age": 77,
+              "max_age": 77, "limit": 2}
+    seen = []
+    response = client.get("/students/search", params=params)
+    while response.status_code == 200:
+        seen += [s["first_name"] for s in response.json()]
+        after = response.headers.get("x-next-cursor")
+        if after is None:
+            break
+        response = client.get("/students/search",
+                              params={**params, "after": after})
+    assert seen == names
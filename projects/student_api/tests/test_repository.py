@@ -0,0 +1,186 @@
+# Run from the student_api folder:  python -m pytest tests
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from repository import StudentRepository  # noqa: E402
+from student import GenderEnum, Student  # noqa: E402
+
+FIRST = ["alice", "bob", "carol", "dave", "eve", "frank", "grace", "heidi"]
+LAST = ["smith", "jones", "brown", "taylor", "wilson", "evans"]
+SORTS = ["first_name", "last_name", "email", "age"]
+
+
+def add(repo, first, last, age=30, gender=GenderEnum.other):
+    email = repo.allocate_email(first.lower(), last.lower())
+    return repo.add(Student(first_name=first, last_name=last, age=age,
+                            gender=gender, phone="+1234567", email=email))
+
+
+def rename(repo, student, first):
+    repo.update(student.id, {"first_name": first})
+    repo.set_email(student.id, repo.allocate_email(
+        first.lower(), student.last_name.lower(), exclude_id=student.id))
+
+
+@pytest.fixture(scope="module")
+def roster():
+    # a random roster, with updates and soft deletes on top, so the
+    # indexes have been maintained and not just built
+    rng = random.Random(2)
+    repo = StudentRepository()
+    students = [add(repo, rng.choice(FIRST).title(),
+                    rng.choice(LAST).title(), rng.randint(19, 60),
+                    rng.choice(list(GenderEnum)))
+                for _ in range(1500)]
+    for _ in range(400):
+        student = rng.choice(students)
+        if rng.random() < 0.3:
+            repo.soft_delete(student.id)
+        elif repo.get(student.id) is not None:
+            repo.update(student.id, {"age": rng.randint(19, 60)})
+            rename(repo, student, rng.choice(FIRST).title())
+    return repo
+
+
+def scan(repo, first_name=None, last_name=None, email=None, gender=None,
+         min_age=None, max_age=None):
+    # what the planner must return: a filter over every active
+    # student, in insertion order
+    def keep(s):
+        return ((not first_name or first_name.lower() in
+                 s.first_name.lower())
+                and (not last_name or last_name.lower() in
+                     s.last_name.lower())
+                and (not email or email.lower() in s.email.lower())
+                and (not gender or s.gender == gender)
+                and (min_age is None or s.age >= min_age)
+                and (max_age is None or s.age <= max_age))
+    return [s for s in repo.active() if keep(s)]
+
+
+def random_filters(rng):
+    filters = {}
+    if rng.random() < 0.4:
+        name = rng.choice(FIRST)
+        start = rng.randrange(len(name))
+        filters["first_name"] = \
+            name[start:start + rng.randint(1, 5)].upper()
+    if rng.random() < 0.4:
+        name = rng.choice(LAST)
+        start = rng.randrange(len(name))
+        filters["last_name"] = name[start:start + rng.randint(1, 6)]
+    if rng.random() < 0.3:
+        # local part, domain, across the "@", and no match at all
+        filters["email"] = rng.choice([
+            "e.sm", "smith2", ".co", "ce.jones1", "x", "@stu", "h2@s",
+            "univ", "@", "s@student-university.co.uk", "a@b"])
+    if rng.random() < 0.4:
+        filters["gender"] = rng.choice(list(GenderEnum))
+    if rng.random() < 0.4:
+        filters["min_age"] = rng.randint(15, 65)
+    if rng.random() < 0.4:
+        filters["max_age"] = rng.randint(15, 65)
+    return filters
+
+
+def sort_key(field):
+    def key(student):
+        value = getattr(student, field)
+        return value.lower() if isinstance(value, str) else value
+    return key
+
+
+def test_search_matches_a_full_scan(roster):
+    rng = random.Random(7)
+    for _ in range(1500):
+        filters = random_filters(rng)
+        assert [s.id for s in roster.search(**filters)] == \
+            [s.id for s in scan(roster, **filters)], filters
+
+
+def test_pages_match_a_sorted_scan(roster):
+    rng = random.Random(11)
+    for _ in range(300):
+        filters = random_filters(rng)
+        sort_by = rng.choice(SORTS)
+        descending = rng.random() < 0.5
+        skip, limit = rng.randint(0, 50), rng.randint(1, 100)
+        # a stable sort: ties stay in insertion order either way
+        expected = [s.id for s in sorted(scan(roster, **filters),
+                                         key=sort_key(sort_by),
+                                         reverse=descending)]
+        page, _ = roster.page(sort_by, descending, skip, limit, **filters)
+        assert [s.id for s in page] == expected[skip:skip + limit], \
+            (sort_by, descending, filters)
+
+
+def test_cursor_walk_visits_every_match_once(roster):
+    rng = random.Random(13)
+    for _ in range(60):
+        filters = random_filters(rng)
+        sort_by = rng.choice(SORTS)
+        descending = rng.random() < 0.5
+        expected = [s.id for s in sorted(scan(roster, **filters),
+                                         key=sort_key(sort_by),
+                                         reverse=descending)]
+        seen, after = [], None
+        while True:
+            page, after = roster.page(sort_by, descending, 0, 37,
+                                      after=after, **filters)
+            seen += [s.id for s in page]
+            if len(page) < 37:
+                break
+        assert seen == expected, (sort_by, descending, filters)
+
+
+def test_unsorted_pages_are_in_insertion_order(roster):
+    page, cursor = roster.page(None, skip=5, limit=20,
+                               gender=GenderEnum.male)
+    assert [s.id for s in page] == \
+        [s.id for s in scan(roster, gender=GenderEnum.male)][5:25]
+    assert cursor is None
+
+
+def test_ngram_index_follows_renames():
+    repo = StudentRepository()
+    student = add(repo, "Alice", "Smith")
+    rename(repo, student, "Zed")
+    assert repo.search(first_name="lic") == []
+    assert repo.search(first_name="ze") == [student]
+    assert repo.search(email="alice") == []
+    assert repo.search(email="zed.smith@") == [student]
+    # needles longer than the n-gram size are checked on the value
+    assert repo.search(last_name="smith") == [student]
+    assert repo.search(last_name="smithy") == []
+
+
+def test_soft_deleted_students_leave_every_index():
+    repo = StudentRepository()
+    alice = add(repo, "Alice", "Smith", age=20, gender=GenderEnum.female)
+    bob = add(repo, "Bob", "Smith", age=22, gender=GenderEnum.male)
+    carol = add(repo, "Carol", "Jones", age=24, gender=GenderEnum.female)
+    repo.soft_delete(bob.id)
+    assert repo.get(bob.id) is None
+    assert list(repo.active()) == [alice, carol]
+    assert repo.search(last_name="smith") == [alice]
+    assert repo.search(gender=GenderEnum.male) == []
+    assert repo.search(min_age=21, max_age=23) == []
+    assert repo.page("age", descending=True)[0] == [carol, alice]
+    # soft-deleted students keep their address
+    assert repo.allocate_email("bob", "smith") == "bob.smith2@" \
+        + repo.email_domain
+
+
+def test_orderings_follow_updates():
+    repo = StudentRepository()
+    old = add(repo, "Alice", "Smith", age=40)
+    young = add(repo, "Bob", "Jones", age=20)
+    assert repo.page("age")[0] == [young, old]
+    repo.update(old.id, {"age": 19})
+    assert repo.page("age")[0] == [old, young]
+    assert repo.search(min_age=30) == []
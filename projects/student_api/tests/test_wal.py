@@ -0,0 +1,121 @@
+# Run from the student_api folder:  python -m pytest tests
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wal import SNAPSHOT, WriteAheadLog  # noqa: E402
+
+
+class Store:
+    """The smallest store the log works with: put() + iteration"""
+
+    def __init__(self):
+        self.records = {}
+
+    def put(self, record):
+        self.records[record["id"]] = record
+
+    def __iter__(self):
+        return iter(list(self.records.values()))
+
+
+def open_log(directory, store=None, seed=(), **kwargs):
+    store = store if store is not None else Store()
+    kwargs.setdefault("flush_interval", 0)
+    wal = WriteAheadLog(str(directory), **kwargs)
+    replayed = wal.open(store, encode=json.dumps, decode=dict, seed=seed)
+    return wal, store, replayed
+
+
+def write(wal, store, record, op="update"):
+    store.put(record)
+    wal.append(op, record)
+
+
+def segments(directory):
+    return sorted(name for name in os.listdir(directory)
+                  if name.startswith("wal-"))
+
+
+def test_empty_directory_starts_from_the_seed(tmp_path):
+    wal, store, replayed = open_log(tmp_path, seed=[{"id": 1, "v": 0}])
+    wal.close()
+    assert replayed == 0
+    _, store, _ = open_log(tmp_path)
+    assert store.records == {1: {"id": 1, "v": 0}}
+
+
+def test_log_is_replayed_in_order(tmp_path):
+    wal, store, _ = open_log(tmp_path, seed=[{"id": 1, "v": 0}])
+    for v in range(1, 4):
+        write(wal, store, {"id": 1, "v": v})
+    write(wal, store, {"id": 2, "v": 0}, op="add")
+    wal.close()
+
+    wal, store, replayed = open_log(tmp_path)
+    assert replayed == 1 + 4          # snapshot row + log records
+    assert store.records == {1: {"id": 1, "v": 3}, 2: {"id": 2, "v": 0}}
+    # and new records carry on after the replayed ones
+    write(wal, store, {"id": 2, "v": 1})
+    wal.close()
+    _, store, _ = open_log(tmp_path)
+    assert store.records[2] == {"id": 2, "v": 1}
+
+
+def test_torn_tail_is_cut_off(tmp_path):
+    wal, store, _ = open_log(tmp_path)
+    write(wal, store, {"id": 1, "v": 1})
+    write(wal, store, {"id": 1, "v": 2})
+    wal.close()
+    # a crash in the middle of the third append
+    path = os.path.join(tmp_path, segments(tmp_path)[-1])
+    with open(path, "ab") as f:
+        f.write(b'{"seq":2,"op":"update","student":{"id": 1, "v"')
+    size = os.path.getsize(path)
+
+    wal, store, _ = open_log(tmp_path)
+    assert store.records == {1: {"id": 1, "v": 2}}
+    assert os.path.getsize(path) < size
+    write(wal, store, {"id": 1, "v": 3})
+    wal.close()
+    _, store, _ = open_log(tmp_path)
+    assert store.records == {1: {"id": 1, "v": 3}}
+
+
+def test_snapshot_plus_log_tail(tmp_path):
+    wal, store, _ = open_log(tmp_path, snapshot_every=5)
+    for v in range(12):
+        write(wal, store, {"id": v % 3, "v": v})
+    wal.close()       # waits for the background snapshot
+    # a snapshot at seq 5, and another one 5 writes later, or at the
+    # first write after that once the first one has finished;
+    # older segments are gone
+    with open(os.path.join(tmp_path, SNAPSHOT)) as f:
+        seq = json.loads(f.readline())["seq"]
+    assert 5 <= seq <= 12
+    assert segments(tmp_path)[0] == f"wal-{seq:012d}.ndjson"
+
+    _, replayed_store, replayed = open_log(tmp_path, snapshot_every=5)
+    assert replayed_store.records == store.records
+    assert replayed == 3 + (12 - seq)     # snapshot rows + log tail
+
+
+def test_record_changed_during_a_snapshot_is_not_lost(tmp_path):
+    wal, store, _ = open_log(tmp_path, snapshot_every=2)
+    write(wal, store, {"id": 1, "v": 1})
+    write(wal, store, {"id": 1, "v": 2})     # starts a snapshot
+    write(wal, store, {"id": 1, "v": 3})     # lands in the new segment
+    wal.close()
+    _, store, _ = open_log(tmp_path)
+    assert store.records == {1: {"id": 1, "v": 3}}
+
+
+def test_appends_reach_the_file_before_any_fsync(tmp_path):
+    wal, store, _ = open_log(tmp_path, flush_interval=60)
+    write(wal, store, {"id": 1, "v": 1})
+    path = os.path.join(tmp_path, segments(tmp_path)[-1])
+    with open(path, "rb") as f:
+        assert json.loads(f.read())["student"] == {"id": 1, "v": 1}
+    wal.close()
@@ -0,0 +1,241 @@
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+import json
+import os
+import threading
+
+# =====================
+# Write-ahead log for the in-memory student store
+#
+# Layout of the WAL directory:
+#   snapshot.ndjson        {"seq": N} header, then one student per line
+#   wal-<first seq>.ndjson one record per write:
+#                          {"seq": 7, "op": "update", "student": {...}}
+#
+# - Every write appends the student's full new state, so replay
+#   is just "put this record" and applying a record twice is harmless
+# - Appends go to the OS straight away (the segment file is
+#   unbuffered, one write() per record), fsync is batched: a
+#   background thread syncs whatever was written in the last
+#   flush_interval seconds (group commit). A crash loses at most
+#   that window; flush_interval=0 syncs on every write instead
+# - Every snapshot_every writes the log starts a new segment and a
+#   background thread writes the store (as it was at that seq) to a
+#   new snapshot, then deletes the older segments, so startup replay
+#   is snapshot + a short log tail. The write that triggers it only
+#   pays for copying the list of records, not for the JSON + fsync
+# =====================
+SNAPSHOT = "snapshot.ndjson"
+SEGMENT_PREFIX = "wal-"
+SEGMENT_SUFFIX = ".ndjson"
+
+
+class WriteAheadLog:
+    def __init__(self, directory: str,
+                 flush_interval: float = 0.01,
+                 snapshot_every: int = 10000):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self._store: Any = None
+        self._encode: Callable[[Any], str] = str
+        self._file = None
+        self._seq = 0                # seq of the next record
+        self._since_snapshot = 0
+        self._dirty = False          # written but not fsynced yet
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._snapshotter: Optional[threading.Thread] = None
+
+    # =====================
+    # Startup: snapshot + log tail replay
+    # =====================
+    def open(self, store: Any,
+             encode: Callable[[Any], str],
+             decode: Callable[[Any], Any],
+             seed: Iterable[Any] = ()) -> int:
+        # Loads everything on disk into `store` (iterable, with a
+        # put(record) method) and returns the number of records
+        # replayed. An empty directory starts from `seed`.
+        # encode: record -> JSON text, decode: parsed JSON -> record
+        os.makedirs(self.directory, exist_ok=True)
+        self._store = store
+        self._encode = encode
+        replayed = 0
+        snapshot_seq = 0
+        snapshot_path = os.path.join(self.directory, SNAPSHOT)
+        has_snapshot = os.path.exists(snapshot_path)
+        if has_snapshot:
+            with open(snapshot_path, "rb") as f:
+                snapshot_seq = json.loads(f.readline())["seq"]
+                for line in f:
+                    store.put(decode(json.loads(line)))
+                    replayed += 1
+        self._seq = snapshot_seq
+        for _, path in self._segments():
+            good = 0                 # end of the last complete record
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("no newline")
+                        record = json.loads(line)
+                    except ValueError:
+                        break        # torn write at the end of the log
+                    good += len(line)
+                    if record["seq"] < snapshot_seq:
+                        continue
+                    store.put(decode(record["student"]))
+                    self._seq = record["seq"] + 1
+                    self._since_snapshot += 1
+                    replayed += 1
+            if good != os.path.getsize(path):
+                # cut the torn tail off so new records are not
+                # appended behind it
+                with open(path, "r+b") as f:
+                    f.truncate(good)
+        if not has_snapshot and not replayed:
+            for record in seed:
+                store.put(record)
+            self.snapshot()
+        else:
+            self._start_segment()
+        if self.flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop,
+                                             name="student-wal",
+                                             daemon=True)
+            self._flusher.start()
+        return replayed
+
+    # =====================
+    # Writes
+    # =====================
+    def append(self, op: str, record: Any) -> None:
+        # Logs the record's new state; op is for people reading
+        # the log, replay treats every op the same way
+        record_json = self._encode(record)
+        with self._lock:
+            line = (f'{{"seq":{self._seq},"op":"{op}",'
+                    f'"student":{record_json}}}\n')
+            self._file.write(line.encode())
+            self._seq += 1
+            self._since_snapshot += 1
+            self._dirty = True
+            if self.flush_interval <= 0:
+                self._sync()
+        if self._since_snapshot >= self.snapshot_every and \
+                not self._snapshot_running():
+            self._snapshot_in_background()
+        elif self.flush_interval > 0:
+            self._wake.set()
+
+    def _sync(self) -> None:
+        # caller holds self._lock
+        if self._dirty and self._file is not None:
+            os.fsync(self._file.fileno())
+            self._dirty = False
+
+    def _flush_loop(self) -> None:
+        while not self._closed.is_set():
+            self._wake.wait()
+            # let more writes join this fsync (group commit)
+            self._closed.wait(self.flush_interval)
+            self._wake.clear()
+            with self._lock:
+                self._sync()
+
+    # =====================
+    # Compaction
+    # =====================
+    def snapshot(self) -> None:
+        # Writes the whole store, then drops the older segments.
+        # Blocks until done (used at startup and by tests).
+        self._wait_for_snapshot()
+        self._write_snapshot(*self._cut())
+
+    def _snapshot_in_background(self) -> None:
+        seq, records = self._cut()
+        self._snapshotter = threading.Thread(
+            target=self._write_snapshot, args=(seq, records),
+            name="student-wal-snapshot", daemon=True)
+        self._snapshotter.start()
+
+    def _snapshot_running(self) -> bool:
+        return self._snapshotter is not None and \
+            self._snapshotter.is_alive()
+
+    def _wait_for_snapshot(self) -> None:
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+            self._snapshotter = None
+
+    def _cut(self) -> Tuple[int, List[Any]]:
+        # New writes go to a new segment from here on; returns the
+        # seq the snapshot covers and the records as of that seq
+        # (a copy of the list, so the store can keep changing)
+        with self._lock:
+            self._sync()
+            self._start_segment()
+            self._since_snapshot = 0
+            return self._seq, list(self._store)
+
+    def _write_snapshot(self, seq: int, records: List[Any]) -> None:
+        # A record changed after the cut may be written in its newer
+        # state; that is harmless, its log record (seq >= `seq`) is
+        # replayed on top of it anyway
+        path = os.path.join(self.directory, SNAPSHOT)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(json.dumps({"seq": seq}).encode() + b"\n")
+            f.writelines(self._encode(record).encode() + b"\n"
+                         for record in records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)    # atomic: old or new, never half
+        self._fsync_directory()
+        for start, old in self._segments():
+            if start < seq:
+                os.remove(old)
+
+    def _start_segment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        name = f"{SEGMENT_PREFIX}{self._seq:012d}{SEGMENT_SUFFIX}"
+        # unbuffered: each record reaches the OS in one write()
+        self._file = open(os.path.join(self.directory, name), "ab",
+                          buffering=0)
+        self._fsync_directory()
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and \
+                    name.endswith(SEGMENT_SUFFIX):
+                start = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                segments.append((start, os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def _fsync_directory(self) -> None:
+        # makes renames/new files durable (not supported on Windows)
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    # =====================
+    # Shutdown
+    # =====================
+    def close(self) -> None:
+        self._closed.set()
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self._wait_for_snapshot()
+        with self._lock:
+            self._sync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
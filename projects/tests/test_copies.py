@@ -0,0 +1,28 @@
+# Run from the projects folder:  python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import check_copies  # noqa: E402
+
+
+def test_copied_modules_are_identical():
+    assert check_copies.differences() == []
+
+
+def test_every_copy_is_listed():
+    # a new copy of a shared module must be added to COPIES
+    found = {}
+    for folder, folders, files in os.walk(check_copies.HERE):
+        # skip virtualenvs, caches and the like
+        folders[:] = [f for f in folders if not f.startswith((".", "_"))
+                      and f not in ("venv", "node_modules")]
+        for name in files:
+            if name in check_copies.COPIES:
+                path = os.path.relpath(os.path.join(folder, name),
+                                       check_copies.HERE)
+                found.setdefault(name, []).append(
+                    path.replace(os.sep, "/"))
+    for name, paths in check_copies.COPIES.items():
+        assert sorted(found[name]) == sorted(paths)
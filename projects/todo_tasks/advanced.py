@@ -3,10 +3,15 @@ This Python file is the backend for index.html
 Once a form is submitted, FastAPI should receive the resources
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from pydantic import BaseModel
 from typing import List
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+import uuid
+
+from compression import CompressionMiddleware
+from shared_state import open_store
 
 # Create a FastAPI instance
 app = FastAPI()
@@ -23,6 +28,9 @@ app.add_middleware(
     allow_headers=["*"],      # Allow all headers
 )
 
+# Compress large responses (gzip / brotli / zstd, see compression.py)
+app.add_middleware(CompressionMiddleware)
+
 
 # Define a request body model using Pydantic
 # This describes what data the backend expects from the form
@@ -33,10 +41,26 @@ class FormRequest(BaseModel):
     mobile: str
 
 
-# In-memory database (list)
+# In-memory database
 # This stores submitted form data temporarily in memory
 # (will reset every time the server restarts)
-forms: List[FormRequest] = []
+# STATE_BACKEND=sqlite keeps it in a SQLite file (STATE_PATH) shared
+# by every uvicorn worker instead
+forms = open_store("forms",
+                   encode=FormRequest.model_dump_json,
+                   decode=FormRequest.model_validate_json)
+
+
+# NDJSON streaming: clients sending "Accept: application/x-ndjson"
+# get one form per line, sent in batches instead of one big list
+NDJSON = "application/x-ndjson"
+STREAM_BATCH = 500
+
+
+async def stream_forms(snapshot: List[FormRequest]):
+    for start in range(0, len(snapshot), STREAM_BATCH):
+        batch = snapshot[start:start + STREAM_BATCH]
+        yield "".join(form.model_dump_json() + "\n" for form in batch)
 
 
 # Root endpoint - just a test route
@@ -46,15 +70,21 @@ async def index():
 
 
 # GET endpoint to fetch all submitted forms
-# Returns the list of forms in memory
+# Returns the list of forms in memory (or streams it as NDJSON)
 @app.get("/forms/", response_model=List[FormRequest])
-async def get_all_forms():
-    return forms
+async def get_all_forms(request: Request):
+    if NDJSON in request.headers.get("accept", ""):
+        # values() is a copy (references only) so new submissions
+        # can't change it while it streams
+        return StreamingResponse(stream_forms(forms.values()),
+                                 media_type=NDJSON)
+    return forms.values()
 
 
 # POST endpoint to accept form submissions
-# Takes FormRequest (JSON body) and appends it to the in-memory list
+# Takes FormRequest (JSON body) and adds it to the store
 @app.post("/forms/", response_model=FormRequest)
 async def create_form(form: FormRequest):
-    forms.append(form)
+    async with forms.writing():
+        forms[uuid.uuid4().hex] = form
     return form
@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+import itertools
 # from pydantic import BaseModel
 
 """
@@ -10,68 +11,80 @@ HTTP Methods:
 """
 app = FastAPI()
 
-# list of tasks stored as dictionaries
-todo_tasks = [
-    {"task_id": 1, "task_name": "shopping",
+# tasks stored as dictionaries, keyed by task_id
+# (a dict keeps insertion order, and finding a task by id
+# is a single lookup instead of a loop over every task)
+todo_tasks = {
+    1: {"task_id": 1, "task_name": "shopping",
         "task_description": "purchase items from shopping list"},
-    {"task_id": 2, "task_name": "medicine",
-     "task_description": "collect medicine from pharmacy"},
-    {"task_id": 3, "task_name": "exam",
-     "task_description": "study for exam"},
-    {"task_id": 4, "task_name": "meditate",
-     "task_description": "meditate for self-development"},
-    {"task_id": 5, "task_name": "chores",
-     "task_description": "complete house chores mentioned on list"}
-]
+    2: {"task_id": 2, "task_name": "medicine",
+        "task_description": "collect medicine from pharmacy"},
+    3: {"task_id": 3, "task_name": "exam",
+        "task_description": "study for exam"},
+    4: {"task_id": 4, "task_name": "meditate",
+        "task_description": "meditate for self-development"},
+    5: {"task_id": 5, "task_name": "chores",
+        "task_description": "complete house chores mentioned on list"}
+}
+
+# hands out ids for tasks posted without one
+task_ids = itertools.count(max(todo_tasks) + 1)
 
 
 # =============== get all tasks
 @app.get("/")
 async def get_all_tasks():
-    return todo_tasks
+    return list(todo_tasks.values())
 
 
 # define an endpoint that takes a task_id from the URL
 @app.get("/tasks/{task_id}")
 # FastAPI makes sure task_id is an integer
 async def get_task(task_id: int):
-    # loop through each dictionary in the todo_tasks list
-    for task in todo_tasks:
-        # check if the current task_id matches the one from the URL
-        if task["task_id"] == task_id:
-            # if it matches, return that task as JSON
-            return {"result": task}
+    # look the task up by its id
+    task = todo_tasks.get(task_id)
+    if task is not None:
+        # if it exists, return that task as JSON
+        return {"result": task}
 
 
 # =============== add new task
 @app.post("/tasks/")
 async def post_task(new_task: dict):
-    todo_tasks.append(new_task)
+    # tasks without an id get the next free one
+    if "task_id" not in new_task:
+        task_id = next(task_ids)
+        while task_id in todo_tasks:
+            task_id = next(task_ids)
+        new_task["task_id"] = task_id
+    # never overwrite another task
+    elif new_task["task_id"] in todo_tasks:
+        raise HTTPException(status_code=409, detail="task id already exists")
+    todo_tasks[new_task["task_id"]] = new_task
     return {"message": "task added", "task": new_task}
 
 
 # =============== edit existing task
 @app.put("/tasks/{task_id}")
 async def edit_task(task_id: int, updated_task: dict):
-    # loop through all tasks in the todo_tasks list
-    for task in todo_tasks:
-        # check if the current task's id matches the one from the url
-        if task["task_id"] == task_id:
-            # update existing task dictionary with new values from request body
-            task.update(updated_task)
-            # return a success message along with the updated task
-            return {"message": "task updated", "task": task}
+    # look the task up by its id
+    task = todo_tasks.get(task_id)
     # if no task with the given id is found, return an error message
-    return {"message": "task not found"}
+    if task is None:
+        return {"message": "task not found"}
+    # update existing task dictionary with new values from request body
+    task.update(updated_task)
+    # the id in the URL wins: a task_id in the body is ignored, so an
+    # edit can never replace another task
+    task["task_id"] = task_id
+    # return a success message along with the updated task
+    return {"message": "task updated", "task": task}
 
 
 # =============== delete existing task
 @app.delete("/tasks/{task_id}")
 async def delete_task(task_id: int):
-    # loop through all tasks
-    for task in todo_tasks:
-        # check if ids match
-        if task["task_id"] == task_id:
-            # remove the task from the list
-            todo_tasks.remove(task)
-            return {"message": "task deleted", "task": task}
+    # remove the task if it exists
+    task = todo_tasks.pop(task_id, None)
+    if task is not None:
+        return {"message": "task deleted", "task": task}
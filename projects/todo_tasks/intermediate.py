@@ -1,12 +1,32 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from datetime import datetime
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field, ValidationError
+from contextlib import asynccontextmanager
+from collections import deque
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import Optional, List
+from typing import Annotated, Dict, Literal, Optional, List, Union
+import asyncio
+import logging
+import os
+import time
 import uuid
 
+from shared_state import open_store
+from task_index import TaskIndex
+
+logger = logging.getLogger(__name__)
+
+
+# ========== App lifespan: runs the due-date sweeper in the background
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sweeper = asyncio.create_task(sweep_due_tasks())
+    yield
+    sweeper.cancel()
+
+
 # create FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 # ========== Enums for restricted choices
@@ -42,8 +62,150 @@ class TodoTask(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.now)
 
 
-# ========== In-memory storage
-todo_tasks: List[TodoTask] = []
+# ========== Batch operation models (POST /tasks/batch)
+# patch: only the fields sent are changed (not a full replacement)
+class TaskPatch(BaseModel):
+    task_name: Optional[str] = None
+    task_description: Optional[str] = None
+    status: Optional[TaskStatus] = None
+    priority: Optional[TaskPriority] = None
+    due_date: Optional[datetime] = None
+    category: Optional[TaskCategory] = None
+
+
+class CreateOperation(BaseModel):
+    op: Literal["create"]
+    task: TodoTask
+
+
+class PatchOperation(BaseModel):
+    op: Literal["patch"]
+    id: str
+    changes: TaskPatch
+
+
+class DeleteOperation(BaseModel):
+    op: Literal["delete"]
+    id: str
+
+
+# the "op" field picks which of the three models is used
+BatchOperation = Annotated[Union[CreateOperation, PatchOperation,
+                                 DeleteOperation],
+                           Field(discriminator="op")]
+
+
+class BatchResult(BaseModel):
+    op: str
+    id: str
+    task: Optional[TodoTask] = None   # None for deletes
+
+
+# ========== Storage
+# task id -> task, kept in insertion order
+# STATE_BACKEND=sqlite shares it between uvicorn workers through a
+# SQLite file (STATE_PATH), otherwise it is a per-process dict
+todo_tasks = open_store("todo_tasks",
+                        encode=TodoTask.model_dump_json,
+                        decode=TodoTask.model_validate_json)
+
+# status / priority / category buckets for filtering (task_index.py)
+# every write goes through save_task / remove_task so the index
+# never falls behind the store; changes made by other workers
+# arrive through on_change
+task_index = TaskIndex()
+task_index.rebuild(todo_tasks.values())
+todo_tasks.on_change(lambda task_id, task: task_index.put(task) if task
+                     else task_index.forget(task_id))
+
+
+def save_task(task: TodoTask):
+    todo_tasks[task.id] = task
+    task_index.put(task)
+    index_changed.set()   # wake the sweeper, the next due date may move
+
+
+def remove_task(task_id: str) -> Optional[TodoTask]:
+    task = todo_tasks.pop(task_id, None)
+    if task is not None:
+        task_index.forget(task_id)
+    return task
+
+
+# ========== Due-date sweeper
+# Wakes up when the next due date passes (or every SWEEP_INTERVAL
+# seconds, to notice tasks added by other workers), and handles only
+# the tasks due since the last sweep, found with the due-date index:
+# - records an event in overdue_events (GET /tasks/overdue/events)
+# - with PROMOTE_OVERDUE=1, raises the task's priority to high
+SWEEP_INTERVAL = float(os.getenv("SWEEP_INTERVAL", "30"))
+PROMOTE_OVERDUE = os.getenv("PROMOTE_OVERDUE", "0") == "1"
+
+overdue_events: deque = deque(maxlen=1000)
+index_changed = asyncio.Event()
+
+
+async def sweep(since: float, until: float):
+    # the sweeper synced the store just before
+    for task in todo_tasks.get_many(task_index.due_between(since, until)):
+        task_id = task.id
+        overdue_events.append({"task_id": task_id,
+                               "task_name": task.task_name,
+                               "due_date": task.due_date,
+                               "detected_at": datetime.now()})
+        logger.info("task %s is overdue", task_id)
+        if PROMOTE_OVERDUE:
+            async with todo_tasks.writing():
+                # re-read: another worker may have changed it meanwhile
+                task = todo_tasks.get(task_id)
+                if task is not None and task.priority != TaskPriority.high:
+                    save_task(task.model_copy(update={
+                        "priority": TaskPriority.high,
+                        "updated_at": datetime.now()}))
+
+
+async def sweep_due_tasks():
+    # tasks already overdue at startup are not reported again
+    swept_until = time.time()
+    failed = False
+    while True:
+        next_due = task_index.next_due_after(swept_until)
+        delay = SWEEP_INTERVAL if next_due is None or failed else \
+            min(max(next_due - time.time(), 0), SWEEP_INTERVAL)
+        index_changed.clear()
+        try:
+            await asyncio.wait_for(index_changed.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            todo_tasks.sync()   # pick up other workers' changes
+            now = time.time()
+            await sweep(swept_until, now)
+        except Exception:
+            # e.g. the SQLite state file stayed locked: keep the
+            # sweeper alive and retry the same window a bit later
+            logger.exception("due-date sweep failed, retrying in %ss",
+                             SWEEP_INTERVAL)
+            failed = True
+            continue
+        failed = False
+        swept_until = now
+
+
+# ========== ETags / conditional GET
+# the store's version changes on every add/edit/delete (in any
+# worker), and the ETag is built from it, so a client polling with
+# If-None-Match gets an empty 304 while nothing has changed
+def tasks_etag() -> str:
+    return f'"tasks-{todo_tasks.version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
 
 
 # ========== Routes
@@ -55,10 +217,57 @@ async def main():
 
 
 # ========== Return all tasks
+# optional ?status=&priority=&category= filters are answered from
+# the bucket indexes, only matching tasks are touched
 @app.get("/tasks/", response_model=List[TodoTask])
-async def get_all_tasks():
-    # return the list of all tasks
-    return todo_tasks
+async def get_all_tasks(request: Request, response: Response,
+                        status: Optional[TaskStatus] = None,
+                        priority: Optional[TaskPriority] = None,
+                        category: Optional[TaskCategory] = None):
+    etag = tasks_etag()
+    # nothing changed since the client's copy -> 304, empty body
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    if status is None and priority is None and category is None:
+        # return the list of all tasks
+        return todo_tasks.values()
+    # the index can be used straight away: the store synced with the
+    # other workers when its version was read for the ETag, so
+    # get_many reads the local copy without syncing again per task
+    return todo_tasks.get_many(
+        task_index.match(status=status, priority=priority,
+                         category=category))
+
+
+# ========== Overdue / upcoming tasks (due-date index)
+# only unfinished tasks with a due date are indexed, earliest first
+@app.get("/tasks/overdue", response_model=List[TodoTask])
+async def get_overdue_tasks():
+    todo_tasks.sync()
+    return todo_tasks.get_many(
+        task_index.due_between(float("-inf"), time.time()))
+
+
+# within: seconds (?within=3600) or an ISO 8601 duration such as
+# P2D or PT6H; numbers are tried first, then durations
+@app.get("/tasks/upcoming", response_model=List[TodoTask])
+async def get_upcoming_tasks(
+        within: Union[float, timedelta] = Query(timedelta(days=1))):
+    if isinstance(within, timedelta):
+        within = within.total_seconds()
+    if within < 0:
+        raise HTTPException(status_code=422,
+                            detail="within must not be negative")
+    todo_tasks.sync()
+    now = time.time()
+    return todo_tasks.get_many(task_index.due_between(now, now + within))
+
+
+# ========== Events recorded by the due-date sweeper
+@app.get("/tasks/overdue/events")
+async def get_overdue_events():
+    return list(overdue_events)
 
 
 # ========== Add new task
@@ -69,42 +278,114 @@ async def add_task(task: TodoTask):
         task.id = str(uuid.uuid4())
     # set the updated_at timestamp to now
     task.updated_at = datetime.now()
-    # add the task to the in-memory list
-    todo_tasks.append(task)
+    # add the task to the store (writing() waits for other workers'
+    # writes without blocking the event loop)
+    async with todo_tasks.writing():
+        save_task(task)
     return task
 
 
 # ========== Edit existing task
 @app.put("/tasks/{task_id}", response_model=TodoTask)
 async def edit_task(task_id: str, updated_task: TodoTask):
-    # loop through all tasks with index to locate the one to update
-    for index, task in enumerate(todo_tasks):
-        # check if the current task's ID matches the ID from the URL
-        if task.id == task_id:
-            # preserve the original task's ID
-            updated_task.id = task.id
-            # preserve the original created_at timestamp
-            updated_task.created_at = task.created_at
-            # update the updated_at timestamp to the current time
-            updated_task.updated_at = datetime.now()
-            # replace the old task in the list with the updated task
-            todo_tasks[index] = updated_task
-            # return the updated task as the response
-            return updated_task
-    # if no task matches the given ID, raise a 404 Not Found error
-    raise HTTPException(status_code=404, detail="Task not found")
+    # writing() makes the read + replace atomic across workers
+    async with todo_tasks.writing():
+        # look the task up by its ID
+        task = todo_tasks.get(task_id)
+        # if no task matches the given ID, raise a 404 Not Found error
+        if task is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        # preserve the original task's ID
+        updated_task.id = task.id
+        # preserve the original created_at timestamp
+        updated_task.created_at = task.created_at
+        # update the updated_at timestamp to the current time
+        updated_task.updated_at = datetime.now()
+        # replace the old task with the updated task
+        save_task(updated_task)
+    # return the updated task as the response
+    return updated_task
+
+
+# ========== Batch create / patch / delete
+# All operations are applied, in order, or none are:
+# 1. every operation is checked against a staged copy of the tasks
+#    it touches (later operations see earlier ones, so a task can be
+#    created and then patched in the same batch)
+# 2. only if all of them succeed are the staged tasks written
+# Errors report the index of the failing operation.
+MAX_BATCH = 1000
+
+
+@app.post("/tasks/batch", response_model=List[BatchResult])
+async def batch_tasks(operations: List[BatchOperation]):
+    if len(operations) > MAX_BATCH:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {MAX_BATCH} operations")
+    results: List[BatchResult] = []
+    # writing() also keeps other workers out until everything is saved
+    async with todo_tasks.writing():
+        # task id -> new task, or None if deleted in this batch
+        staged: Dict[str, Optional[TodoTask]] = {}
+
+        def current(task_id: str) -> Optional[TodoTask]:
+            if task_id in staged:
+                return staged[task_id]
+            return todo_tasks.get(task_id)
+
+        for index, operation in enumerate(operations):
+            if operation.op == "create":
+                task = operation.task
+                if current(task.id) is not None:
+                    raise HTTPException(status_code=409, detail={
+                        "index": index, "error": "Task id already exists"})
+                task.updated_at = datetime.now()
+                staged[task.id] = task
+                results.append(BatchResult(op="create", id=task.id,
+                                           task=task))
+                continue
+
+            task = current(operation.id)
+            if task is None:
+                raise HTTPException(status_code=404, detail={
+                    "index": index, "error": "Task not found"})
+            if operation.op == "delete":
+                staged[operation.id] = None
+                results.append(BatchResult(op="delete", id=operation.id))
+                continue
+
+            # patch: merge the sent fields into the current task and
+            # validate the result as a whole
+            changes = operation.changes.model_dump(exclude_unset=True)
+            try:
+                patched = TodoTask.model_validate({
+                    **task.model_dump(), **changes,
+                    "updated_at": datetime.now()})
+            except ValidationError as exc:
+                raise HTTPException(status_code=422, detail={
+                    "index": index,
+                    "error": exc.errors(include_url=False)})
+            staged[operation.id] = patched
+            results.append(BatchResult(op="patch", id=operation.id,
+                                       task=patched))
+
+        # 2. everything checked out: write the final state of each task
+        for task_id, task in staged.items():
+            if task is None:
+                remove_task(task_id)
+            else:
+                save_task(task)
+    return results
 
 
 # ==========  Delete existing task
 @app.delete("/tasks/{task_id}", response_model=TodoTask)
 async def delete_task(task_id: str):
-    # loop through all tasks in the in-memory list
-    for task in todo_tasks:
-        # check if the current task's ID matches the one provided in the URL
-        if task.id == task_id:
-            # if found, remove the task from the list
-            todo_tasks.remove(task)
-            # Return the deleted task as the response
-            return task
+    async with todo_tasks.writing():
+        # remove the task if it exists
+        task = remove_task(task_id)
     # if no task matches the given ID, raise a 404 Not Found error
-    raise HTTPException(status_code=404, detail="Task not found")
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    # Return the deleted task as the response
+    return task
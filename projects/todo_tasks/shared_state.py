@@ -0,0 +1,369 @@
+"""
+Key/value state that can be shared by every worker process.
+
+STATE_BACKEND (env var, or passed to open_store) picks the backend:
+- "memory" (default): a plain per-process dict, as before
+- "sqlite": a SQLite file (STATE_PATH) in WAL mode that every worker
+  opens, so `uvicorn --workers N` sees one consistent store
+
+Both behave like an insertion-ordered dict. With SQLite each worker also
+keeps a local copy: writes go to the file first, reads are served from
+the local copy after pulling in whatever other workers changed (one
+PRAGMA when nothing changed, one indexed query when something did).
+
+Nobody waits on the file's lock inside SQLite (busy_timeout is 0 after
+startup): a write that finds the file locked retries with short sleeps,
+and async code uses `async with store.writing()`, which sleeps with
+asyncio.sleep so the event loop keeps serving other requests meanwhile.
+After STATE_BUSY_TIMEOUT seconds (default 5) it gives up with StoreBusy.
+
+Each project is a standalone app (run from its own folder, with its own
+requirements), so this file is copied into every project that uses it;
+check_copies.py (in projects/) fails when the copies differ.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, \
+    MutableMapping, Optional
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
+STATE_PATH = os.getenv("STATE_PATH", "shared_state.db")
+STATE_BUSY_TIMEOUT = float(os.getenv("STATE_BUSY_TIMEOUT", "5"))
+
+# listener(key, value) - value is None when the key was deleted
+Listener = Callable[[str, Any], None]
+
+
+class StoreBusy(Exception):
+    """Other workers kept the file locked for STATE_BUSY_TIMEOUT seconds"""
+
+
+def _is_busy(exc: sqlite3.OperationalError) -> bool:
+    # SQLITE_BUSY / SQLITE_LOCKED: "database is locked"
+    return "locked" in str(exc) or "busy" in str(exc)
+
+
+class LocalStore(MutableMapping):
+    """Per-process store: a dict plus a change counter"""
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._boot = uuid.uuid4().hex[:8]
+        self._changes = 0
+        self._listeners: List[Listener] = []
+
+    def __getitem__(self, key: str) -> Any:
+        self.sync()
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        self.sync()
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        self.sync()
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        self.sync()
+        return key in self._data
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._data[key] = value
+        self._changes += 1
+
+    def __delitem__(self, key: str) -> None:
+        del self._data[key]
+        self._changes += 1
+
+    def values(self) -> List[Any]:
+        self.sync()
+        return list(self._data.values())
+
+    def get_many(self, keys: Iterable[str]) -> List[Any]:
+        """
+        Values of the keys that exist, in the order given. Does not
+        sync: for bulk reads after one sync() in the same request
+        (item access would check for changes once per key)
+        """
+        data = self._data
+        return [data[key] for key in keys if key in data]
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the contents change (usable in ETags)"""
+        return f"{self._boot}.{self._changes}"
+
+    def sync(self) -> None:
+        """Pull in changes made by other workers (none here)"""
+
+    @contextmanager
+    def write(self):
+        """
+        Group several reads and writes into one atomic step; with
+        SQLite no other worker can write until the block ends
+        """
+        yield self
+
+    @asynccontextmanager
+    async def writing(self):
+        """
+        write() for async code: waiting for the file's write lock does
+        not block the event loop. Do not await inside the block
+        """
+        yield self
+
+    def on_change(self, listener: Listener) -> None:
+        """Call listener(key, value) for changes made by other workers"""
+        self._listeners.append(listener)
+
+    def seed(self, items: Dict[str, Any]) -> None:
+        """Insert items only if the store has never held anything"""
+        with self.write():
+            if not self._data and not self._changes:
+                self.update(items)
+
+
+class SQLiteStore(LocalStore):
+    """Store shared through a SQLite file (one namespace per store)"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS state (
+            ns    TEXT NOT NULL,
+            key   TEXT NOT NULL,
+            value TEXT,               -- NULL marks a deleted key
+            seq   INTEGER NOT NULL,   -- change number of the last write
+            PRIMARY KEY (ns, key)
+        );
+        CREATE INDEX IF NOT EXISTS state_changes ON state (ns, seq);
+        CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY,
+                                         value TEXT NOT NULL);
+        INSERT OR IGNORE INTO meta VALUES ('seq', '0');
+        INSERT OR IGNORE INTO meta VALUES ('id', lower(hex(randomblob(4))));
+    """
+
+    def __init__(self, path: str, namespace: str,
+                 encode: Callable[[Any], str],
+                 decode: Callable[[str], Any]):
+        super().__init__()
+        self.namespace = namespace
+        self._encode = encode
+        self._decode = decode
+        self._lock = threading.RLock()
+        self._depth = 0           # nesting level of write()
+        # autocommit mode: transactions are opened explicitly below
+        self._db = sqlite3.connect(path, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # at startup (schema, WAL switch) waiting inside SQLite is fine
+        self._db.execute(
+            f"PRAGMA busy_timeout={int(STATE_BUSY_TIMEOUT * 1000)}")
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for statement in self.SCHEMA.split(";"):
+                    if statement.strip():
+                        self._db.execute(statement)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        self._boot = self._db.execute(
+            "SELECT value FROM meta WHERE name = 'id'").fetchone()[0]
+        self._seq = 0             # newest change applied locally
+        self._written = False     # current write() block stored something
+        self._load()
+        # from now on a locked file raises at once (see write())
+        self._db.execute("PRAGMA busy_timeout=0")
+
+    def _load(self) -> None:
+        # full load in insertion (rowid) order
+        self._data.clear()
+        self._seq = 0
+        self._data_version = self._pragma_data_version()
+        for key, value, seq in self._db.execute(
+                "SELECT key, value, seq FROM state WHERE ns = ? "
+                "ORDER BY rowid", (self.namespace,)):
+            if value is not None:
+                self._data[key] = self._decode(value)
+            self._seq = max(self._seq, seq)
+
+    def _pragma_data_version(self) -> int:
+        # changes whenever another connection commits to the file
+        return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    @property
+    def version(self) -> str:
+        # same value in every worker for the same contents
+        self.sync()
+        return f"{self._boot}.{self._seq}"
+
+    def sync(self) -> None:
+        with self._lock:
+            try:
+                data_version = self._pragma_data_version()
+                if data_version == self._data_version:
+                    return
+                rows = self._db.execute(
+                    "SELECT key, value, seq FROM state "
+                    "WHERE ns = ? AND seq > ? ORDER BY seq",
+                    (self.namespace, self._seq)).fetchall()
+            except sqlite3.OperationalError as exc:
+                if not _is_busy(exc):
+                    raise
+                # keep serving the local copy, try again next time
+                return
+            self._data_version = data_version
+            for key, value, seq in rows:
+                self._seq = seq
+                if value is None:
+                    if self._data.pop(key, None) is None:
+                        continue
+                    new = None
+                else:
+                    new = self._decode(value)
+                    self._data[key] = new
+                for listener in self._listeners:
+                    listener(key, new)
+
+    @contextmanager
+    def write(self):
+        # blocking version, for startup code and plain functions
+        waits = self._waits()
+        while not self._try_enter():
+            time.sleep(next(waits))
+        ok = False
+        try:
+            yield self
+            ok = True
+        finally:
+            self._leave(ok)
+
+    @asynccontextmanager
+    async def writing(self):
+        waits = self._waits()
+        while not self._try_enter():
+            await asyncio.sleep(next(waits))
+        ok = False
+        try:
+            yield self
+            ok = True
+        finally:
+            self._leave(ok)
+
+    def _waits(self) -> Iterator[float]:
+        # 1ms, 2ms, 4ms ... 50ms between tries, then give up
+        deadline = time.monotonic() + STATE_BUSY_TIMEOUT
+        wait = 0.001
+        while time.monotonic() < deadline:
+            yield wait
+            wait = min(wait * 2, 0.05)
+        raise StoreBusy(f"{self.namespace}: state file is locked")
+
+    def _try_enter(self) -> bool:
+        # takes the thread lock and (unless this thread is already
+        # inside write()) the file's write lock, without waiting for
+        # either; returns False, holding nothing, when one is taken
+        if not self._lock.acquire(blocking=False):
+            return False
+        if self._depth:
+            self._depth += 1
+            return True
+        # BEGIN IMMEDIATE takes the file's write lock, so after the
+        # sync below nobody else can change anything until COMMIT
+        try:
+            self._db.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as exc:
+            self._lock.release()
+            if not _is_busy(exc):
+                raise
+            return False
+        self._depth = 1
+        self._written = False
+        try:
+            self._data_version = None   # force a check for changes
+            self.sync()
+        except BaseException:
+            self._leave(False)
+            raise
+        return True
+
+    def _leave(self, ok: bool) -> None:
+        try:
+            self._depth -= 1
+            if self._depth:
+                return
+            committed = False
+            try:
+                if ok:
+                    self._db.execute("COMMIT")
+                    committed = True
+            finally:
+                if not committed:
+                    self._db.execute("ROLLBACK")
+                    if self._written:
+                        self._reload()
+        finally:
+            self._lock.release()
+
+    def _reload(self) -> None:
+        # a failed write block left the local copy ahead of the
+        # file, so start over from the file
+        self._load()
+        for key, value in self._data.items():
+            for listener in self._listeners:
+                listener(key, value)
+
+    def _store(self, key: str, value: Optional[str]) -> None:
+        with self.write():
+            self._db.execute(
+                "UPDATE meta SET value = value + 1 WHERE name = 'seq'")
+            seq = int(self._db.execute(
+                "SELECT value FROM meta WHERE name = 'seq'").fetchone()[0])
+            # ON CONFLICT keeps the row (and its rowid), so an update
+            # does not move the key to the end of the order
+            self._db.execute(
+                "INSERT INTO state (ns, key, value, seq) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ns, key) DO UPDATE "
+                "SET value = excluded.value, seq = excluded.seq",
+                (self.namespace, key, value, seq))
+            self._seq = seq
+            self._written = True
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with self.write():
+            self._store(key, self._encode(value))
+            self._data[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        with self.write():
+            if key not in self._data:
+                raise KeyError(key)
+            self._store(key, None)
+            del self._data[key]
+
+    def seed(self, items: Dict[str, Any]) -> None:
+        with self.write():
+            # _seq is 0 only if nothing was ever written
+            if not self._seq:
+                self.update(items)
+
+
+def open_store(namespace: str,
+               encode: Callable[[Any], str],
+               decode: Callable[[str], Any],
+               backend: Optional[str] = None,
+               path: Optional[str] = None) -> LocalStore:
+    """Open the store called `namespace` on the configured backend"""
+    backend = (backend or STATE_BACKEND).lower()
+    if backend == "sqlite":
+        return SQLiteStore(path or STATE_PATH, namespace, encode, decode)
+    return LocalStore()
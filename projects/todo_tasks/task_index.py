@@ -0,0 +1,110 @@
+"""
+Secondary indexes over the todo task store (intermediate.py).
+
+- One bucket per enum value (status, priority, category) holding the
+  ids of the tasks with that value, so filtering only touches the tasks
+  that match instead of scanning every task.
+- A due-date index: (due timestamp, position, id) entries of the
+  unfinished tasks that have a due date, kept sorted with bisect, so
+  "due before/between" queries are O(log n + k).
+"""
+
+import bisect
+import itertools
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class TaskIndex:
+    def __init__(self, fields: Tuple[str, ...] = ("status", "priority",
+                                                  "category")):
+        self.fields = fields
+        # field -> value -> ids (a dict used as an ordered set)
+        self._buckets: Dict[str, Dict[Any, Dict[str, None]]] = {
+            field: {} for field in fields}
+        # id -> the values it is filed under, to unfile it later
+        self._filed: Dict[str, Tuple[Any, ...]] = {}
+        # id -> insertion number, to return matches in store order;
+        # numbers are never reused, so after a delete a new task
+        # still sorts after every task already there
+        self._position: Dict[str, int] = {}
+        self._next_position = itertools.count()
+        # sorted (due timestamp, position, id) of unfinished tasks
+        self._due: List[Tuple[float, int, str]] = []
+        # id -> its entry in self._due
+        self._due_entry: Dict[str, Tuple[float, int, str]] = {}
+
+    def put(self, task: Any) -> None:
+        """Index a new task, or re-index one that changed"""
+        self.discard(task.id)
+        values = tuple(getattr(task, field) for field in self.fields)
+        for field, value in zip(self.fields, values):
+            self._buckets[field].setdefault(value, {})[task.id] = None
+        self._filed[task.id] = values
+        if task.id not in self._position:
+            self._position[task.id] = next(self._next_position)
+        if task.due_date is not None and task.status != "complete":
+            # timestamp() treats naive datetimes as local time, so
+            # naive and timezone-aware due dates sort together
+            entry = (task.due_date.timestamp(),
+                     self._position[task.id], task.id)
+            bisect.insort(self._due, entry)
+            self._due_entry[task.id] = entry
+
+    def discard(self, task_id: str) -> None:
+        """Forget a task (no-op if it is not indexed)"""
+        values = self._filed.pop(task_id, None)
+        if values is None:
+            return
+        for field, value in zip(self.fields, values):
+            bucket = self._buckets[field][value]
+            del bucket[task_id]
+            if not bucket:
+                del self._buckets[field][value]
+        entry = self._due_entry.pop(task_id, None)
+        if entry is not None:
+            del self._due[bisect.bisect_left(self._due, entry)]
+
+    def forget(self, task_id: str) -> None:
+        """Task deleted for good: also drop its position"""
+        self.discard(task_id)
+        self._position.pop(task_id, None)
+
+    def match(self, **filters: Optional[Any]) -> List[str]:
+        """
+        Ids of the tasks matching every non-None filter, in insertion
+        order. Starts from the smallest bucket and checks the others,
+        so the cost is O(smallest bucket), not O(all tasks).
+        """
+        wanted = [(field, value) for field, value in filters.items()
+                  if value is not None]
+        buckets = [self._buckets[field].get(value, {})
+                   for field, value in wanted]
+        if not buckets:
+            return sorted(self._filed, key=self._position.__getitem__)
+        buckets.sort(key=len)
+        smallest, others = buckets[0], buckets[1:]
+        ids = [task_id for task_id in smallest
+               if all(task_id in bucket for bucket in others)]
+        ids.sort(key=self._position.__getitem__)
+        return ids
+
+    def due_between(self, start: float, end: float) -> List[str]:
+        """
+        Ids of unfinished tasks due in (start, end], earliest first
+        (start=-inf for everything due up to `end`)
+        """
+        low = bisect.bisect_right(self._due, (start, float("inf")))
+        high = bisect.bisect_right(self._due, (end, float("inf")))
+        return [task_id for _, _, task_id in self._due[low:high]]
+
+    def next_due_after(self, moment: float) -> Optional[float]:
+        """Earliest due timestamp later than `moment`, if any"""
+        i = bisect.bisect_right(self._due, (moment, float("inf")))
+        return self._due[i][0] if i < len(self._due) else None
+
+    def rebuild(self, tasks: Iterable[Any]) -> None:
+        """Index every task from scratch"""
+        for task_id in list(self._filed):
+            self.forget(task_id)
+        for task in tasks:
+            self.put(task)
@@ -0,0 +1,91 @@
+# Run from the todo_tasks folder:  python -m pytest tests
+import os
+import sys
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import intermediate  # noqa: E402
+
+client = TestClient(intermediate.app)
+
+
+def new_task(**fields):
+    return {"id": uuid.uuid4().hex, "task_name": "batch",
+            "task_description": "test", **fields}
+
+
+def batch(*operations):
+    return client.post("/tasks/batch", json=list(operations))
+
+
+def snapshot():
+    # what a rejected batch must leave exactly as it was
+    everything = client.get("/tasks/")
+    high = client.get("/tasks/", params={"priority": "high"}).json()
+    return everything.headers["etag"], everything.json(), high
+
+
+def test_create_then_patch_in_one_batch():
+    task = new_task(priority="low")
+    response = batch({"op": "create", "task": task},
+                     {"op": "patch", "id": task["id"],
+                      "changes": {"priority": "high",
+                                  "status": "in_progress"}})
+    assert response.status_code == 200
+    assert [r["op"] for r in response.json()] == ["create", "patch"]
+    saved = client.get("/tasks/", params={"priority": "high"}).json()
+    saved = [t for t in saved if t["id"] == task["id"]]
+    assert len(saved) == 1
+    assert saved[0]["status"] == "in_progress"
+    assert saved[0]["task_name"] == "batch"
+
+
+def test_delete_after_create_leaves_nothing():
+    task = new_task()
+    assert batch({"op": "create", "task": task},
+                 {"op": "delete", "id": task["id"]}).status_code == 200
+    assert client.delete(f"/tasks/{task['id']}").status_code == 404
+
+
+@pytest.mark.parametrize("failing, status", [
+    ({"op": "patch", "id": "no-such-task", "changes": {}}, 404),
+    ({"op": "delete", "id": "no-such-task"}, 404),
+    ("duplicate", 409),
+    ("invalid patch", 422),
+])
+def test_failed_operation_rolls_back_the_whole_batch(failing, status):
+    existing = new_task(priority="high")
+    assert batch({"op": "create", "task": existing}).status_code == 200
+    before = snapshot()
+
+    created = new_task(priority="high")
+    if failing == "duplicate":
+        failing = {"op": "create", "task": new_task(id=existing["id"])}
+    elif failing == "invalid patch":
+        # task_name may not be null once merged into the task
+        failing = {"op": "patch", "id": existing["id"],
+                   "changes": {"task_name": None}}
+    response = batch({"op": "create", "task": created},
+                     {"op": "patch", "id": existing["id"],
+                      "changes": {"priority": "low"}},
+                     {"op": "patch", "id": existing["id"],
+                      "changes": {"task_name": "renamed"}},
+                     failing)
+    assert response.status_code == status
+    assert response.json()["detail"]["index"] == 3
+
+    # store, index and ETag are untouched
+    assert snapshot() == before
+
+
+def test_too_many_operations_is_a_413(monkeypatch):
+    monkeypatch.setattr(intermediate, "MAX_BATCH", 2)
+    before = snapshot()
+    response = batch(*[{"op": "create", "task": new_task()}
+                       for _ in range(3)])
+    assert response.status_code == 413
+    assert snapshot() == before
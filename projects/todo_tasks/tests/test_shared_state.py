@@ -0,0 +1,63 @@
+# Run from the todo_tasks folder:  python -m pytest tests
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import shared_state  # noqa: E402
+
+
+def open_sqlite(path):
+    return shared_state.open_store("test", encode=json.dumps,
+                                   decode=json.loads,
+                                   backend="sqlite", path=str(path))
+
+
+def test_waiting_for_a_locked_file_does_not_block_the_loop(tmp_path,
+                                                           monkeypatch):
+    monkeypatch.setattr(shared_state, "STATE_BUSY_TIMEOUT", 0.3)
+    store = open_sqlite(tmp_path / "state.db")
+    # another worker holds the write lock
+    other = sqlite3.connect(tmp_path / "state.db", isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        with pytest.raises(shared_state.StoreBusy):
+            async with store.writing():
+                store["a"] = 1
+        # reads keep working from the local copy meanwhile
+        assert "a" not in store
+        other.execute("ROLLBACK")
+        async with store.writing():
+            store["a"] = 1
+        ticking.cancel()
+        return ticks
+
+    # the event loop kept running while the write waited
+    assert asyncio.run(run()) >= 10
+    assert store["a"] == 1
+    assert open_sqlite(tmp_path / "state.db")["a"] == 1
+
+
+def test_get_many_reads_the_local_copy_without_syncing(tmp_path):
+    store = open_sqlite(tmp_path / "state.db")
+    store.update({"a": 1, "b": 2, "c": 3})
+    syncs = []
+    real_sync = store.sync
+    store.sync = lambda: syncs.append(1) or real_sync()
+    assert store.get_many(["c", "missing", "a"]) == [3, 1]
+    assert syncs == []
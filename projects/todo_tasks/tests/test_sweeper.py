@@ -0,0 +1,38 @@
+# Run from the todo_tasks folder:  python -m pytest tests
+import asyncio
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import intermediate  # noqa: E402
+
+
+def test_sweeper_keeps_running_after_a_failed_sweep(monkeypatch):
+    windows = []
+
+    async def flaky_sweep(since, until):
+        windows.append((since, until))
+        if len(windows) == 1:
+            raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(intermediate, "sweep", flaky_sweep)
+    monkeypatch.setattr(intermediate, "SWEEP_INTERVAL", 0.01)
+
+    async def run():
+        sweeper = asyncio.create_task(intermediate.sweep_due_tasks())
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if len(windows) >= 3:
+                break
+        alive = not sweeper.done()
+        sweeper.cancel()
+        return alive
+
+    assert asyncio.run(run())
+    assert len(windows) >= 3
+    # the failed window is swept again, not skipped
+    assert windows[1][0] == windows[0][0]
+    # after a success the next sweep starts where it ended
+    assert windows[2][0] == windows[1][1]
@@ -0,0 +1,38 @@
+# Run from the todo_tasks folder:  python -m pytest tests
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import intermediate  # noqa: E402
+
+client = TestClient(intermediate.app)
+
+
+def add(name, priority="high"):
+    response = client.post("/tasks/", json={"task_name": name,
+                                            "task_description": "test",
+                                            "priority": priority})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_filtered_results_keep_store_order_after_a_delete():
+    a, b, c = add("A"), add("B"), add("C")
+    assert client.delete(f"/tasks/{a}").status_code == 200
+    d = add("D")
+    assert client.put(f"/tasks/{c}", json={"task_name": "C2",
+                                           "task_description": "test",
+                                           "priority": "high"}
+                      ).status_code == 200
+
+    everything = [task["id"] for task in client.get("/tasks/").json()]
+    high = [task["id"] for task in
+            client.get("/tasks/", params={"priority": "high"}).json()]
+    assert [i for i in everything if i in (b, c, d)] == [b, c, d]
+    assert [i for i in high if i in (b, c, d)] == [b, c, d]
+    # and every high-priority task, in the same order as the full list
+    assert high == [task["id"] for task in client.get("/tasks/").json()
+                    if task["priority"] == "high"]
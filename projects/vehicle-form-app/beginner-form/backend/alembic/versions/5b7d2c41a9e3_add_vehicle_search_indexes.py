@@ -0,0 +1,32 @@
+"""add vehicle search indexes
+
+Revision ID: 5b7d2c41a9e3
+Revises: 26e2eb117333
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7d2c41a9e3'
+down_revision: Union[str, Sequence[str], None] = '26e2eb117333'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # /vehicles/search filters on make + model and then narrows or
+    # orders by year; one composite index serves all three instead of
+    # MySQL intersecting the single-column indexes
+    op.create_index('ix_vehicles_make_model_year', 'vehicles',
+                    ['make', 'model', 'year'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_vehicles_make_model_year', table_name='vehicles')
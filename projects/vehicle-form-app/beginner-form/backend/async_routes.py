@@ -0,0 +1,155 @@
+# ================================
+# async_routes.py - async versions of the DB-backed endpoints
+# ================================
+# Included by main.py when DB_MODE=async. Same paths, schemas and
+# responses as the sync endpoints, but every DB round-trip is awaited
+# so one worker can serve many requests while MySQL is busy.
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from async_database import AsyncSessionLocal, get_async_db
+from cache import cache, user_key, vehicle_key
+from database import User, Vehicle
+from etags import etag_headers, etag_matches, not_modified, versions
+from fast_json import ORJSONResponse, RowSerializer, use_fast_path
+from schemas import UserCreate, UserOut, VehicleCreate, VehicleOut
+from streaming import NDJSON, astream_rows, wants_ndjson
+
+router = APIRouter()
+
+USER_ROWS = RowSerializer(User, UserOut)
+VEHICLE_ROWS = RowSerializer(Vehicle, VehicleOut)
+
+# Note: the vehicle id paths use the `:int` path convertor so that fixed
+# paths such as /vehicles/search still reach their sync endpoints.
+
+
+# =============================
+# User Endpoints (async)
+# =============================
+
+
+@router.get("/users", response_model=List[UserOut])
+async def read_users_async(request: Request,
+                           db: AsyncSession = Depends(get_async_db)):
+    """GET all users (streamed as NDJSON if asked for)"""
+    if wants_ndjson(request):
+        return StreamingResponse(
+            astream_rows(AsyncSessionLocal, User, UserOut),
+            media_type=NDJSON)
+    if use_fast_path():
+        return ORJSONResponse(await USER_ROWS.all_async(db))
+    return (await db.scalars(select(User))).all()
+
+
+@router.post("/users", response_model=UserOut)
+async def create_user_async(user: UserCreate,
+                            db: AsyncSession = Depends(get_async_db)):
+    """POST a new user"""
+    new_user = User(name=user.name, email=user.email)
+    db.add(new_user)
+    await db.commit()
+    cache.delete(user_key(new_user.id))
+    return new_user
+
+
+# =============================
+# Vehicle Endpoints (async)
+# =============================
+
+
+@router.get("/vehicles", response_model=List[VehicleOut])
+async def get_all_vehicles_async(request: Request, response: Response,
+                                 db: AsyncSession = Depends(get_async_db)):
+    """GET all vehicles (NDJSON if asked for, 304 if ETag matches)"""
+    ndjson = wants_ndjson(request)
+    etag = versions.etag("vehicles", "ndjson" if ndjson else "json")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    if ndjson:
+        return StreamingResponse(
+            astream_rows(AsyncSessionLocal, Vehicle, VehicleOut),
+            media_type=NDJSON,
+            headers=etag_headers(etag))
+    if use_fast_path():
+        return ORJSONResponse(await VEHICLE_ROWS.all_async(db),
+                              headers=etag_headers(etag))
+    response.headers.update(etag_headers(etag))
+    return (await db.scalars(select(Vehicle))).all()
+
+
+@router.get("/vehicles/{vehicle_id:int}", response_model=VehicleOut)
+async def get_vehicle_async(vehicle_id: int, request: Request,
+                            response: Response,
+                            db: AsyncSession = Depends(get_async_db)):
+    """GET a single vehicle by its ID (ETag + read-through cache)"""
+    etag = versions.etag("vehicles", vehicle_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    key = vehicle_key(vehicle_id)
+    data = cache.get(key)
+    if data is None:
+        vehicle = await db.scalar(
+            select(Vehicle).where(Vehicle.id == vehicle_id))
+        if not vehicle:
+            raise HTTPException(status_code=404, detail="Vehicle not found")
+        data = VehicleOut.model_validate(vehicle).model_dump()
+        cache.set(key, data)
+    if etag is not None:
+        response.headers["ETag"] = etag
+    return data
+
+
+@router.post("/vehicles", response_model=VehicleOut)
+async def create_vehicle_async(vehicle: VehicleCreate,
+                               db: AsyncSession = Depends(get_async_db)):
+    """POST a new vehicle"""
+    new_vehicle = Vehicle(**vehicle.model_dump())
+    db.add(new_vehicle)
+    await db.commit()
+    cache.delete(vehicle_key(new_vehicle.id))
+    versions.bump("vehicles")
+    return new_vehicle
+
+
+@router.put("/vehicles/{vehicle_id:int}", response_model=VehicleOut)
+async def update_vehicle_async(vehicle_id: int,
+                               updated_vehicle: VehicleCreate,
+                               db: AsyncSession = Depends(get_async_db)):
+    """PUT: update a vehicle's data (single UPDATE, see main.py)"""
+    data = updated_vehicle.model_dump()
+    result = await db.execute(
+        update(Vehicle)
+        .where(Vehicle.id == vehicle_id)
+        .values(**data)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+
+    await db.commit()
+    cache.delete(vehicle_key(vehicle_id))
+    versions.bump("vehicles")
+    return VehicleOut(id=vehicle_id, **data)
+
+
+@router.delete("/vehicles/{vehicle_id:int}")
+async def delete_vehicle_async(vehicle_id: int,
+                               db: AsyncSession = Depends(get_async_db)):
+    """DELETE a vehicle by ID (single DELETE, see main.py)"""
+    result = await db.execute(
+        delete(Vehicle)
+        .where(Vehicle.id == vehicle_id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+
+    await db.commit()
+    cache.delete(vehicle_key(vehicle_id))
+    versions.bump("vehicles")
+    return {"message": "Vehicle deleted", "id": vehicle_id}
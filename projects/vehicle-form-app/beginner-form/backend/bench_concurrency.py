@@ -0,0 +1,76 @@
+"""
+Concurrency benchmark for the vehicle backend.
+
+Start the server in the mode you want to measure, for example
+
+    DB_MODE=sync  uvicorn main:app --port 8000
+    DB_MODE=async uvicorn main:app --port 8000
+
+then run
+
+    python bench_concurrency.py --clients 500 --requests 20000
+
+once per mode and compare the throughput and latency percentiles.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def run_client(http, path, remaining, latencies, errors):
+    """One simulated client: send requests back to back until none are left"""
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        start = time.perf_counter()
+        try:
+            response = await http.get(path)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        except httpx.HTTPError as exc:
+            errors.append(type(exc).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def main(base_url, path, clients, requests):
+    limits = httpx.Limits(max_connections=clients,
+                          max_keepalive_connections=clients)
+    latencies = []
+    errors = []
+    remaining = [requests]
+    async with httpx.AsyncClient(base_url=base_url, limits=limits,
+                                 timeout=60) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            run_client(http, path, remaining, latencies, errors)
+            for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1,
+                             int(len(latencies) * p))] * 1000
+
+    print(f"clients:     {clients}")
+    print(f"requests:    {len(latencies)} ok, {len(errors)} failed")
+    print(f"elapsed:     {elapsed:.2f}s")
+    print(f"throughput:  {len(latencies) / elapsed:.0f} req/s")
+    if latencies:
+        print(f"latency avg: {statistics.mean(latencies) * 1000:.1f} ms")
+        print(f"latency p50: {percentile(0.50):.1f} ms")
+        print(f"latency p99: {percentile(0.99):.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/vehicles/1")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.path, args.clients, args.requests))
@@ -0,0 +1,66 @@
+"""
+Serialization benchmark for GET /vehicles.
+
+Runs the app in-process (no server, no network) and measures CPU time
+per request with the pydantic response_model path and with the fast
+orjson path from fast_json.py. Point it at a scratch database, e.g.
+
+    DATABASE_URL=sqlite:///./bench.db python bench_serialization.py --rows 5000
+
+Missing rows are inserted first so the table holds at least --rows.
+"""
+
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select
+
+import fast_json
+from database import Base, SessionLocal, Vehicle, engine
+from main import app
+
+SAMPLE = dict(make="Ford", model="Focus", year=2015, colour="Blue",
+              body="Hatchback", doors=5, transmission="Manual",
+              engineSize=1.6, fuel="Petrol")
+
+
+def seed(rows):
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        missing = rows - db.scalar(select(func.count()).select_from(Vehicle))
+        if missing > 0:
+            db.execute(insert(Vehicle), [SAMPLE] * missing)
+            db.commit()
+
+
+def measure(client, mode, requests):
+    """Average CPU milliseconds per request in the given mode"""
+    fast_json.SERIALIZER_MODE = mode
+    client.get("/vehicles")               # warm up
+    start = time.process_time()
+    for _ in range(requests):
+        body = client.get("/vehicles").content
+    return (time.process_time() - start) / requests * 1000, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    client = TestClient(app)
+    before, slow_body = measure(client, "pydantic", args.requests)
+    after, fast_body = measure(client, "fast", args.requests)
+
+    print(f"rows per response : {args.rows}")
+    print(f"pydantic path     : {before:8.2f} ms CPU / request")
+    print(f"fast path         : {after:8.2f} ms CPU / request")
+    print(f"speed-up          : {before / after:8.2f}x")
+    print(f"same JSON         : {slow_body == fast_body}")
+
+
+if __name__ == "__main__":
+    main()
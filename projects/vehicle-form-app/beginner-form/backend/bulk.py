@@ -0,0 +1,235 @@
+# ================================
+# bulk.py - bulk import helpers (JSON array / NDJSON / CSV)
+# ================================
+# Used by POST /vehicles/bulk and POST /users/bulk in main.py.
+# - rows are parsed as they arrive (NDJSON and CSV are streamed)
+# - each row is validated with the normal *Create schema
+# - valid rows are inserted in batches: one executemany INSERT and
+#   one transaction per batch
+# - invalid rows (bad JSON, failed validation, DB constraint errors)
+#   are reported back with their row number instead of failing
+#   the whole import, sorted by row
+
+import csv
+import json
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+
+# Stop listing errors after this many (they are still counted)
+MAX_REPORTED_ERRORS = 1000
+
+
+# -----------------------------
+# 1. Parsing
+# -----------------------------
+class RowError:
+    """A row that could not be parsed, with the reason"""
+    # a class of its own: a valid JSON row can be a plain string too
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+async def _lines(request: Request):
+    """
+    Yield the request body line by line while it is being received
+    (a RowError for a line that is not valid UTF-8)
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield _decode(line)
+    if buffer:
+        yield _decode(buffer)
+
+
+def _decode(line: bytes):
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError as exc:
+        return RowError(f"Invalid UTF-8: {exc}")
+
+
+async def iter_records(request: Request):
+    """
+    Yield (row number, parsed record or RowError) for every row.
+    The format is picked from the Content-Type header:
+    - application/json      a JSON array of objects
+    - application/x-ndjson  one JSON object per line
+    - text/csv              header line, then one row per record
+                            (quoted values may span lines)
+    """
+    content_type = request.headers.get("content-type", "")
+    content_type = content_type.split(";")[0].strip().lower()
+
+    if content_type == "application/json":
+        # a JSON array has to be parsed in one go
+        try:
+            records = json.loads(await request.body())
+        except ValueError as exc:
+            raise HTTPException(status_code=400,
+                                detail=f"Invalid JSON: {exc}")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400,
+                                detail="Expected a JSON array")
+        for row, record in enumerate(records, start=1):
+            yield row, record
+
+    elif content_type == "application/x-ndjson":
+        row = 0
+        async for line in _lines(request):
+            if isinstance(line, RowError):
+                row += 1
+                yield row, line
+                continue
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                yield row, json.loads(line)
+            except ValueError as exc:
+                yield row, RowError(f"Invalid JSON: {exc}")
+
+    elif content_type == "text/csv":
+        header = None
+        row = 0
+        # physical lines of the current record: a quoted value may
+        # hold line breaks, so a record ends at a line break outside
+        # quotes (an even number of " so far; "" counts twice)
+        pending = []
+        quotes = 0
+        async for line in _lines(request):
+            if isinstance(line, RowError):
+                if header is None:
+                    raise HTTPException(status_code=400,
+                                        detail=f"CSV header: {line.message}")
+                row += 1
+                yield row, line
+                pending, quotes = [], 0
+                continue
+            if not pending and not line.strip():
+                continue
+            pending.append(line + "\n")
+            quotes += line.count('"')
+            if quotes % 2:
+                continue
+            values = next(csv.reader(pending))
+            pending, quotes = [], 0
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            row += 1
+            if len(values) != len(header):
+                yield row, RowError(f"Expected {len(header)} columns, "
+                                    f"got {len(values)}")
+            else:
+                yield row, dict(zip(header, values))
+        if pending:
+            row += 1
+            yield row, RowError("Unterminated quoted value")
+
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Use application/json, application/x-ndjson or text/csv")
+
+
+# -----------------------------
+# 2. Batched inserts
+# -----------------------------
+def insert_batch(model, rows):
+    """
+    Insert [(row number, data dict), ...] in one transaction.
+    Returns (rows inserted, errors). If the batch violates a constraint
+    (e.g. a duplicate email) it is retried row by row so only the
+    offending rows are rejected.
+    """
+    db = SessionLocal()
+    try:
+        try:
+            # one executemany INSERT for the whole batch
+            db.execute(insert(model), [data for _, data in rows])
+            db.commit()
+            return len(rows), []
+        except IntegrityError:
+            db.rollback()
+
+        inserted = 0
+        errors = []
+        for row, data in rows:
+            try:
+                db.execute(insert(model), [data])
+                db.commit()
+                inserted += 1
+            except IntegrityError as exc:
+                db.rollback()
+                errors.append({"row": row, "errors": [str(exc.orig)]})
+        return inserted, errors
+    finally:
+        db.close()
+
+
+async def bulk_import(request: Request, model, schema, batch_size: int):
+    """Validate and insert every row of the request body"""
+    received = 0
+    inserted = 0
+    failed = 0
+    errors = []
+    batch = []
+
+    def report(row_errors):
+        nonlocal failed
+        failed += len(row_errors)
+        errors.extend(row_errors)
+        # batch errors arrive after later rows' validation errors, so
+        # keep the lowest row numbers, not the first ones reported
+        if len(errors) > 2 * MAX_REPORTED_ERRORS:
+            errors.sort(key=lambda error: error["row"])
+            del errors[MAX_REPORTED_ERRORS:]
+
+    async def flush():
+        nonlocal inserted, batch
+        if batch:
+            # DB work runs in the threadpool, off the event loop
+            count, batch_errors = await run_in_threadpool(
+                insert_batch, model, batch)
+            inserted += count
+            report(batch_errors)
+            batch = []
+
+    async for row, record in iter_records(request):
+        received += 1
+        if isinstance(record, RowError):
+            report([{"row": row, "errors": [record.message]}])
+            continue
+        if not isinstance(record, dict):
+            # e.g. a string or number inside a JSON array
+            report([{"row": row, "errors": ["Expected a JSON object"]}])
+            continue
+        try:
+            data = schema.model_validate(record).model_dump()
+        except ValidationError as exc:
+            report([{"row": row, "errors": exc.errors(
+                include_url=False, include_context=False)}])
+            continue
+        batch.append((row, data))
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+    errors.sort(key=lambda error: error["row"])
+    del errors[MAX_REPORTED_ERRORS:]
+
+    return {
+        "received": received,
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+    }
@@ -0,0 +1,212 @@
+# ================================
+# cache.py - read-through cache for single vehicle / user reads
+# ================================
+# Backends (CACHE_BACKEND env var):
+# - "memory" (default): in-process LRU with a TTL
+# - "redis": any Redis-compatible server (REDIS_URL), needs `redis`
+# - "fakeredis": the Redis backend on an in-process FakeRedis client,
+#   to try it (and test it) without a server
+# - "none": caching disabled
+# Entries are plain dicts (the *Out schema dumped), keyed like
+# "vehicle:42". Writes invalidate the affected key; TTL is the
+# safety net for changes made outside this API.
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))   # seconds
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+def vehicle_key(vehicle_id: int) -> str:
+    return f"vehicle:{vehicle_id}"
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+# -----------------------------
+# 1. Counters
+# -----------------------------
+class CacheStats:
+    """Hit/miss/eviction counters shared by every backend"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0        # dropped for space or TTL
+        self.invalidations = 0    # dropped because the row changed
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# -----------------------------
+# 2. Backends
+# -----------------------------
+class LRUCache:
+    """In-process LRU cache with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES,
+                 ttl: float = CACHE_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        # key -> (expires at, value); order = least recently used first
+        self._entries = OrderedDict()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                self.stats.count("evictions")
+                entry = None
+            if entry is None:
+                self.stats.count("misses")
+                return None
+            self._entries.move_to_end(key)
+        self.stats.count("hits")
+        return entry[1]
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.count("evictions")
+
+    def delete(self, key: str):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.stats.count("invalidations")
+
+    def info(self) -> dict:
+        return {"backend": "memory", "entries": len(self._entries),
+                "max_entries": self.max_entries, "ttl": self.ttl,
+                **self.stats.as_dict()}
+
+
+class RedisCache:
+    """Cache stored in Redis (or anything speaking the same commands)"""
+
+    def __init__(self, client, ttl: float = CACHE_TTL,
+                 prefix: str = "vehicle-form:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.stats.count("misses")
+            return None
+        self.stats.count("hits")
+        return json.loads(raw)
+
+    def set(self, key: str, value):
+        # Redis expires and evicts entries itself (maxmemory policy)
+        self.client.set(self.prefix + key, json.dumps(value),
+                        ex=max(int(self.ttl), 1))
+
+    def delete(self, key: str):
+        if self.client.delete(self.prefix + key):
+            self.stats.count("invalidations")
+
+    def info(self) -> dict:
+        return {"backend": "redis", "ttl": self.ttl,
+                **self.stats.as_dict()}
+
+
+class FakeRedis:
+    """
+    Tiny in-memory stand-in for a Redis client (get/set with expiry,
+    delete), so the Redis backend can be exercised without a server
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._data = {}
+
+    def get(self, name):
+        entry = self._data.get(name)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self._data[name]
+            return None
+        return value
+
+    def set(self, name, value, ex=None):
+        expires_at = self.clock() + ex if ex else None
+        self._data[name] = (value.encode() if isinstance(value, str)
+                            else value, expires_at)
+        return True
+
+    def delete(self, *names):
+        return sum(self._data.pop(name, None) is not None for name in names)
+
+
+class NullCache:
+    """Caching disabled: every read is a miss"""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key: str):
+        self.stats.count("misses")
+        return None
+
+    def set(self, key: str, value):
+        pass
+
+    def delete(self, key: str):
+        pass
+
+    def info(self) -> dict:
+        return {"backend": "none", **self.stats.as_dict()}
+
+
+def make_cache(backend: str = CACHE_BACKEND, client=None):
+    """
+    Build the backend selected by CACHE_BACKEND; client replaces the
+    Redis client (e.g. a FakeRedis in tests)
+    """
+    if backend == "redis" and client is None:
+        import redis  # optional dependency, only needed for this backend
+        client = redis.Redis.from_url(REDIS_URL)
+    if backend == "fakeredis" and client is None:
+        client = FakeRedis()
+    if backend in ("redis", "fakeredis"):
+        return RedisCache(client)
+    if backend == "none":
+        return NullCache()
+    return LRUCache()
+
+
+# The cache used by the endpoints
+cache = make_cache()
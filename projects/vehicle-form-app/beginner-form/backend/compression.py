@@ -0,0 +1,237 @@
+"""
+Response compression middleware (gzip, brotli, zstd).
+
+    app.add_middleware(CompressionMiddleware)
+
+- The encoding is picked from the client's Accept-Encoding, in the order
+  of COMPRESSION_ENCODINGS; brotli and zstd are only offered when the
+  `brotli` / `zstandard` packages are installed
+- Only text-like responses (JSON, NDJSON, HTML, CSS, JS, ...) of at least
+  COMPRESSION_MIN_SIZE bytes are compressed, and never ones that already
+  have a Content-Encoding
+- Streaming-aware: every body chunk is compressed and flushed on its
+  own, so streamed responses (NDJSON exports) stay streamed and memory
+  use does not grow with the size of the response
+- Big chunks are compressed in a worker thread (zlib, brotli and zstd
+  release the GIL), so megabyte lists do not stall the event loop
+
+Levels: GZIP_LEVEL (1-9), BROTLI_QUALITY (0-11), ZSTD_LEVEL (1-22);
+the defaults favour speed, as responses are compressed on every request.
+
+Each project is a standalone app (run from its own folder, with its own
+requirements), so this file is copied into every project that uses it,
+like shared_state.py; check_copies.py (in projects/) fails when the
+copies differ.
+"""
+
+import os
+import zlib
+from typing import Dict, List, Optional, Set
+
+import anyio
+
+try:
+    import brotli
+except ImportError:     # optional
+    brotli = None
+try:
+    import zstandard
+except ImportError:     # optional
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_ENCODINGS = [
+    e.strip() for e in
+    os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",")]
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+# chunks at least this big are compressed off the event loop
+THREAD_THRESHOLD = 256 * 1024
+
+COMPRESSIBLE = ("text/", "application/json", "application/x-ndjson",
+                "application/javascript", "application/xml",
+                "image/svg+xml")
+
+
+# =====================
+# One streaming compressor per encoding:
+# compress(chunk) returns what can be sent so far (flushed, so the
+# client can decode it straight away), finish() the end of the stream
+# =====================
+class GzipCompressor:
+    def __init__(self, level: int):
+        # wbits=31: gzip header + trailer (not raw zlib)
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        self._b = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._b.process(data) + self._b.flush()
+
+    def finish(self) -> bytes:
+        return self._b.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int):
+        self._z = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data) + \
+            self._z.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+def available_encodings() -> Dict[str, object]:
+    # encoding name -> function making a new compressor
+    makers = {"gzip": lambda: GzipCompressor(GZIP_LEVEL)}
+    if brotli is not None:
+        makers["br"] = lambda: BrotliCompressor(BROTLI_QUALITY)
+    if zstandard is not None:
+        makers["zstd"] = lambda: ZstdCompressor(ZSTD_LEVEL)
+    return {name: makers[name] for name in COMPRESSION_ENCODINGS
+            if name in makers}
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    # "gzip, br;q=0.5, zstd;q=0" -> {"gzip", "br"} (q=0 means "not this")
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+# =====================
+# Middleware (plain ASGI, so streamed bodies pass through chunk by chunk)
+# =====================
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        accepted = accepted_encodings(
+            header_value(scope["headers"], b"accept-encoding") or "")
+        encoding = next((name for name in self.encodings
+                         if name in accepted), None)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        await CompressedResponse(self, encoding)(scope, receive, send)
+
+
+class CompressedResponse:
+    """Rewrites one response on its way out"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.start: Optional[dict] = None    # held until the first chunk
+        self.compressor = None               # None: sent unchanged
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.middleware.app(scope, receive, self.wrapped_send)
+
+    async def wrapped_send(self, message):
+        if message["type"] == "http.response.start":
+            # decided when the first body chunk shows how big it is
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            return await self.send(message)
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            await self.begin(start, body, more_body)
+            if self.passthrough:
+                return await self.send(message)
+        elif self.passthrough:
+            return await self.send(message)
+
+        data = await self.compress(body) if body else b""
+        if not more_body:
+            data += self.compressor.finish()
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data,
+                             "more_body": more_body})
+
+    async def begin(self, start: dict, body: bytes, more_body: bool):
+        headers: List = list(start.get("headers", []))
+        content_type = header_value(headers, b"content-type") or ""
+        compressible = content_type.startswith(COMPRESSIBLE)
+        if compressible:
+            # caches must keep the compressed and plain versions apart
+            add_vary(headers)
+        if (not compressible
+                or start["status"] < 200 or start["status"] in (204, 304)
+                or header_value(headers, b"content-encoding") is not None
+                or (not more_body
+                    and len(body) < self.middleware.minimum_size)):
+            self.passthrough = True
+            await self.send({**start, "headers": headers})
+            return
+
+        self.compressor = self.middleware.encodings[self.encoding]()
+        # the length changes, and an ETag now describes different bytes:
+        # keep it as a weak ETag (every app here accepts W/ in If-None-Match)
+        headers = [(name, value) for name, value in headers
+                   if name.lower() != b"content-length"]
+        headers = [(name, weak_etag(value) if name.lower() == b"etag"
+                    else value) for name, value in headers]
+        headers.append((b"content-encoding", self.encoding.encode()))
+        await self.send({**start, "headers": headers})
+
+    async def compress(self, data: bytes) -> bytes:
+        if len(data) >= THREAD_THRESHOLD:
+            return await anyio.to_thread.run_sync(self.compressor.compress,
+                                                  data)
+        return self.compressor.compress(data)
+
+
+# =====================
+# Header helpers (raw ASGI headers: list of (bytes, bytes))
+# =====================
+def header_value(headers, name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def add_vary(headers: List) -> None:
+    for i, (key, value) in enumerate(headers):
+        if key.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[i] = (key, value + b", Accept-Encoding")
+            return
+    headers.append((b"vary", b"Accept-Encoding"))
+
+
+def weak_etag(value: bytes) -> bytes:
+    return value if value.startswith(b"W/") else b"W/" + value
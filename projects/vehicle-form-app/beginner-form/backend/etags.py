@@ -0,0 +1,100 @@
+# ================================
+# etags.py - ETags + conditional GET (If-None-Match -> 304)
+# ================================
+# Every collection ("vehicles", ...) has a version number that the
+# create/update/delete endpoints bump. ETags are built from that number,
+# so checking If-None-Match needs no DB query and no serialization:
+# if the client's tag still matches, it gets an empty 304 response.
+#
+# The counters are only correct if every worker sees every bump, so
+# ETAGS (env var) decides when ETags are sent:
+# - "auto" (default): only with CACHE_BACKEND=redis (shared counters)
+# - "on": always; only safe with a single worker, since under
+#   `uvicorn --workers N` a worker that never saw a write would keep
+#   answering 304 with stale data
+# - "off": never
+
+import os
+import threading
+import uuid
+from typing import Optional
+
+from fastapi import Request, Response
+
+from cache import CACHE_BACKEND, cache
+
+ETAGS = os.getenv("ETAGS", "auto").lower()
+
+
+class CollectionVersions:
+    """
+    Per-collection version counters.
+    - in-process by default; the boot id keeps tags from an earlier
+      run of the server from matching after a restart
+    - with CACHE_BACKEND=redis the counters live in Redis (INCR), so
+      every worker agrees on the current version
+    """
+
+    def __init__(self, client=None, prefix: str = "vehicle-form:version:",
+                 enabled: bool = True):
+        self.client = client
+        self.enabled = enabled
+        self.prefix = prefix
+        self.boot = "shared" if client is not None else uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def current(self, name: str) -> int:
+        if self.client is not None:
+            return int(self.client.get(self.prefix + name) or 0)
+        return self._versions.get(name, 0)
+
+    def bump(self, name: str) -> int:
+        """Call after every committed write to the collection"""
+        if self.client is not None:
+            return self.client.incr(self.prefix + name)
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            return self._versions[name]
+
+    def etag(self, name: str, *parts) -> Optional[str]:
+        """
+        Strong ETag for the collection, or an item/variant of it
+        (None when ETags are turned off)
+        """
+        if not self.enabled:
+            return None
+        tag = "-".join(str(p) for p in (self.boot, name,
+                                        self.current(name), *parts))
+        return f'"{tag}"'
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """True when If-None-Match lists this ETag (or is "*")"""
+    header = request.headers.get("if-none-match")
+    if not header or etag is None:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    # weak comparison, as RFC 9110 asks for If-None-Match
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+def etag_headers(etag: Optional[str]) -> dict:
+    """Headers for a list response (no ETag when they are turned off)"""
+    headers = {"Vary": "Accept"}
+    if etag is not None:
+        headers["ETag"] = etag
+    return headers
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the current ETag"""
+    return Response(status_code=304,
+                    headers={"ETag": etag, "Vary": "Accept"})
+
+
+# The counters used by the endpoints (shared through Redis when the
+# cache is, see cache.py)
+versions = CollectionVersions(
+    cache.client if CACHE_BACKEND == "redis" else None,
+    enabled=ETAGS == "on" or (ETAGS == "auto" and CACHE_BACKEND == "redis"))
@@ -0,0 +1,61 @@
+# ================================
+# fast_json.py - fast-path JSON for the big list endpoints
+# ================================
+# With response_model=List[VehicleOut], FastAPI builds an ORM object per
+# row, validates each one into VehicleOut and only then serializes it.
+# For rows we just read from our own DB that validation is redundant,
+# so in "fast" mode the list endpoints:
+# - select only the schema's columns as plain tuples (no ORM objects)
+# - turn each tuple into a dict keyed by the schema's field names
+# - serialize the whole list in one orjson.dumps call
+# SERIALIZER_MODE=pydantic switches back to the response_model path
+# (bench_serialization.py compares the two).
+
+import os
+from typing import Any, Dict, List
+
+import orjson
+from fastapi import Response
+from sqlalchemy import select
+
+SERIALIZER_MODE = os.getenv("SERIALIZER_MODE", "fast").lower()
+
+
+def use_fast_path() -> bool:
+    """Read per request, so the benchmark can flip the mode"""
+    return SERIALIZER_MODE == "fast"
+
+
+class ORJSONResponse(Response):
+    """JSON response rendered with orjson (bytes are sent as they are)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content)
+
+
+class RowSerializer:
+    """
+    Precomputed column list + field names for one (model, schema) pair.
+    - fields come out in the schema's order, same JSON as VehicleOut
+    - only safe for trusted rows: nothing is validated
+    """
+
+    def __init__(self, model, schema):
+        self.fields = list(schema.model_fields)
+        self.statement = select(*(getattr(model, name)
+                                  for name in self.fields))
+
+    def rows(self, result) -> List[Dict[str, Any]]:
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in result]
+
+    def all(self, db) -> List[Dict[str, Any]]:
+        """Every row, read with a sync Session"""
+        return self.rows(db.execute(self.statement))
+
+    async def all_async(self, db) -> List[Dict[str, Any]]:
+        """Every row, read with an AsyncSession"""
+        return self.rows(await db.execute(self.statement))
@@ -2,14 +2,32 @@
 # main.py - FastAPI app with Users + Vehicles
 # ================================
 
-from fastapi import FastAPI, Depends, HTTPException
+import base64
+import binascii
+import json
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, delete, or_, select, update
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
 
 # Import database models and DB session dependency
-from database import get_db, User, Vehicle
+from database import get_db, DB_MODE, engine, pool_metrics, User, Vehicle
+# Pydantic schemas and NDJSON streaming helpers
+from schemas import UserCreate, UserOut, VehicleCreate, VehicleOut
+from streaming import NDJSON, stream_rows, wants_ndjson
+# Bulk import (JSON array / NDJSON / CSV)
+from bulk import bulk_import
+# Read-through cache for single vehicle / user reads
+from cache import cache, user_key, vehicle_key
+# ETags from per-collection version counters
+from etags import etag_headers, etag_matches, not_modified, versions
+# Fast-path list serialization (orjson, no per-row validation)
+from fast_json import ORJSONResponse, RowSerializer, use_fast_path
+# gzip / brotli / zstd response compression
+from compression import CompressionMiddleware
 
 # -----------------------------
 # FastAPI App Setup
@@ -31,51 +49,20 @@ app.add_middleware(
     allow_headers=["*"],        # Allow all headers
 )
 
+# Compress responses of COMPRESSION_MIN_SIZE bytes and up (big
+# GET /vehicles lists, streamed exports) for clients that accept it
+app.add_middleware(CompressionMiddleware)
+
 # -----------------------------
-# Pydantic Schemas
+# Async mode (DB_MODE=async)
 # -----------------------------
-# Pydantic models define the "shape" of data sent to/returned from API
-# They validate inputs and control JSON serialization
-
-# User schemas
-
-
-class UserCreate(BaseModel):
-    """Schema for creating a new user"""
-    name: str
-    email: str
-
-
-class UserOut(UserCreate):
-    """Schema for returning user info (includes ID)"""
-    id: int
-
-    class Config:
-        # allows SQLAlchemy objects to be converted to JSON automatically
-        from_attributes = True
-
-# Vehicle schemas
-
-
-class VehicleCreate(BaseModel):
-    """Schema for creating a vehicle"""
-    make: str
-    model: str
-    year: int
-    colour: str
-    body: str
-    doors: int
-    transmission: str
-    engineSize: float
-    fuel: str
-
-
-class VehicleOut(VehicleCreate):
-    """Schema for returning a vehicle (includes ID)"""
-    id: int
-
-    class Config:
-        from_attributes = True
+# The async router is included before the sync endpoints below, so for
+# the paths it defines its `async def` versions are matched first and
+# requests no longer hold a threadpool worker during DB round-trips.
+# Every other endpoint keeps working through the sync session.
+if DB_MODE == "async":
+    from async_routes import router as async_router
+    app.include_router(async_router)
 
 # -----------------------------
 # Root endpoint
@@ -87,18 +74,48 @@ def landing_page():
     """Simple landing page to confirm API is running"""
     return {"message": "Welcome to the vehicle + user database."}
 
+# -----------------------------
+# Metrics endpoint
+# -----------------------------
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Connection pool metrics: checkouts, connections in use,
+    checkout wait times and pool timeouts
+    Cache metrics: hits, misses, evictions, invalidations
+    """
+    result = {"db_pool": pool_metrics.snapshot(engine.pool),
+              "cache": cache.info()}
+    if DB_MODE == "async":
+        from async_database import async_engine, async_pool_metrics
+        result["async_db_pool"] = async_pool_metrics.snapshot(
+            async_engine.sync_engine.pool)
+    return result
+
+# Precomputed SELECTs for the fast list path (see fast_json.py)
+USER_ROWS = RowSerializer(User, UserOut)
+VEHICLE_ROWS = RowSerializer(Vehicle, VehicleOut)
+
 # =============================
 # User Endpoints (DB-backed)
 # =============================
 
 
 @app.get("/users", response_model=List[UserOut])
-def read_users(db: Session = Depends(get_db)):
+def read_users(request: Request, db: Session = Depends(get_db)):
     """
     GET all users from the database.
     - db: SQLAlchemy session injected via Depends()
-    - returns a list of users
+    - returns a list of users (streamed as NDJSON if asked for)
+    - fast path: column tuples straight to orjson (fast_json.py)
     """
+    if wants_ndjson(request):
+        return StreamingResponse(stream_rows(User, UserOut),
+                                 media_type=NDJSON)
+    if use_fast_path():
+        return ORJSONResponse(USER_ROWS.all(db))
     return db.query(User).all()  # simple SELECT * FROM users
 
 
@@ -111,33 +128,215 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     """
     new_user = User(name=user.name, email=user.email)  # create ORM object
     db.add(new_user)        # stage the object to be added
-    db.commit()             # save it to the DB
-    db.refresh(new_user)    # refresh to get auto-generated ID
+    db.commit()             # save it to the DB (ID filled in by the INSERT)
+    cache.delete(user_key(new_user.id))
     return new_user         # returned as JSON using UserOut schema
 
+
+@app.get("/users/{user_id:int}", response_model=UserOut)
+def get_user(user_id: int, db: Session = Depends(get_db)):
+    """
+    GET a single user by its ID (read-through cache)
+    - Raises 404 if user not found
+    """
+    key = user_key(user_id)
+    data = cache.get(key)
+    if data is None:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        data = UserOut.model_validate(user).model_dump()
+        cache.set(key, data)
+    return data
+
+
+@app.post("/users/bulk")
+async def bulk_create_users(
+    request: Request,
+    batch_size: int = Query(500, ge=1, le=5000)
+):
+    """
+    POST many users at once (JSON array, NDJSON or CSV body).
+    - every row is validated with UserCreate
+    - rows are inserted batch_size at a time, one transaction per batch
+    - returns counts plus the row number and reason of every failure
+    """
+    return await bulk_import(request, User, UserCreate, batch_size)
+
 # =============================
 # Vehicle Endpoints (DB-backed)
 # =============================
 
 
 @app.get("/vehicles", response_model=List[VehicleOut])
-def get_all_vehicles(db: Session = Depends(get_db)):
+def get_all_vehicles(request: Request, response: Response,
+                     db: Session = Depends(get_db)):
     """
     GET all vehicles from the database
+    - streamed as NDJSON if asked for
+    - 304 Not Modified if the client's ETag is still current
+    - fast path: column tuples straight to orjson (fast_json.py)
     """
+    ndjson = wants_ndjson(request)
+    etag = versions.etag("vehicles", "ndjson" if ndjson else "json")
+    if etag_matches(request, etag):
+        return not_modified(etag)   # no query, no serialization
+    if ndjson:
+        return StreamingResponse(stream_rows(Vehicle, VehicleOut),
+                                 media_type=NDJSON,
+                                 headers=etag_headers(etag))
+    if use_fast_path():
+        return ORJSONResponse(VEHICLE_ROWS.all(db),
+                              headers=etag_headers(etag))
+    response.headers.update(etag_headers(etag))
     return db.query(Vehicle).all()  # SELECT * FROM vehicles
 
 
+# -----------------------------
+# Vehicle search
+# -----------------------------
+# Filters only use indexed columns (make, model, year, doors,
+# engineSize), results are ordered by (sort column, id) and pages are
+# fetched with a keyset cursor instead of OFFSET, so every page is an
+# index range scan no matter how deep it is.
+SORT_COLUMNS = {
+    "id": Vehicle.id,
+    "make": Vehicle.make,
+    "model": Vehicle.model,
+    "year": Vehicle.year,
+    "doors": Vehicle.doors,
+    "engineSize": Vehicle.engineSize,
+}
+
+
+def encode_cursor(sort_by: str, order: str, value, last_id: int) -> str:
+    """Opaque token pointing just after the last row of a page"""
+    raw = json.dumps([sort_by, order, value, last_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(token: str, sort_by: str, order: str):
+    """Return (sort value, id) from a cursor, or raise 400"""
+    try:
+        cursor_sort, cursor_order, value, last_id = json.loads(
+            base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort_by or cursor_order != order:
+        raise HTTPException(status_code=400,
+                            detail="Cursor does not match sort order")
+    return value, last_id
+
+
+@app.get("/vehicles/search", response_model=List[VehicleOut])
+def search_vehicles(
+    response: Response,
+    make: Optional[str] = None,
+    model: Optional[str] = None,
+    year: Optional[int] = None,
+    year_min: Optional[int] = None,
+    year_max: Optional[int] = None,
+    doors: Optional[int] = None,
+    doors_min: Optional[int] = None,
+    doors_max: Optional[int] = None,
+    engine_size_min: Optional[float] = None,
+    engine_size_max: Optional[float] = None,
+    sort_by: Literal["id", "make", "model", "year",
+                     "doors", "engineSize"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    GET vehicles matching equality/range filters, sorted and paginated
+    - make + model (+ year) hit the composite ix_vehicles_make_model_year
+    - other filters hit the single-column indexes
+    - the next page's cursor is returned in the X-Next-Cursor header
+    """
+    conditions = []
+    if make is not None:
+        conditions.append(Vehicle.make == make)
+    if model is not None:
+        conditions.append(Vehicle.model == model)
+    if year is not None:
+        conditions.append(Vehicle.year == year)
+    if year_min is not None:
+        conditions.append(Vehicle.year >= year_min)
+    if year_max is not None:
+        conditions.append(Vehicle.year <= year_max)
+    if doors is not None:
+        conditions.append(Vehicle.doors == doors)
+    if doors_min is not None:
+        conditions.append(Vehicle.doors >= doors_min)
+    if doors_max is not None:
+        conditions.append(Vehicle.doors <= doors_max)
+    if engine_size_min is not None:
+        conditions.append(Vehicle.engineSize >= engine_size_min)
+    if engine_size_max is not None:
+        conditions.append(Vehicle.engineSize <= engine_size_max)
+
+    column = SORT_COLUMNS[sort_by]
+    descending = order == "desc"
+
+    # Keyset condition: rows strictly after (value, id) in sort order.
+    # Written as OR/AND rather than a row-value comparison because
+    # MySQL plans it as an index range more reliably.
+    if after:
+        value, last_id = decode_cursor(after, sort_by, order)
+        if sort_by == "id":
+            conditions.append(Vehicle.id < last_id if descending
+                              else Vehicle.id > last_id)
+        elif descending:
+            conditions.append(or_(column < value,
+                                  and_(column == value,
+                                       Vehicle.id < last_id)))
+        else:
+            conditions.append(or_(column > value,
+                                  and_(column == value,
+                                       Vehicle.id > last_id)))
+
+    ordering = [column.desc() if descending else column.asc()]
+    if sort_by != "id":
+        ordering.append(Vehicle.id.desc() if descending
+                        else Vehicle.id.asc())
+
+    statement = (select(Vehicle)
+                 .where(*conditions)
+                 .order_by(*ordering)
+                 .limit(limit))
+    vehicles = db.scalars(statement).all()
+
+    if len(vehicles) == limit:
+        last = vehicles[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            sort_by, order, getattr(last, sort_by), last.id)
+    return vehicles
+
+
 @app.get("/vehicles/{vehicle_id}", response_model=VehicleOut)
-def get_vehicle(vehicle_id: int, db: Session = Depends(get_db)):
+def get_vehicle(vehicle_id: int, request: Request, response: Response,
+                db: Session = Depends(get_db)):
     """
     GET a single vehicle by its ID
+    - 304 Not Modified if the client's ETag is still current
+    - Served from the read-through cache when possible
     - Raises 404 if vehicle not found
     """
-    vehicle = db.query(Vehicle).filter(Vehicle.id == vehicle_id).first()
-    if not vehicle:
-        raise HTTPException(status_code=404, detail="Vehicle not found")
-    return vehicle
+    etag = versions.etag("vehicles", vehicle_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    key = vehicle_key(vehicle_id)
+    data = cache.get(key)
+    if data is None:
+        vehicle = db.query(Vehicle).filter(Vehicle.id == vehicle_id).first()
+        if not vehicle:
+            raise HTTPException(status_code=404, detail="Vehicle not found")
+        data = VehicleOut.model_validate(vehicle).model_dump()
+        cache.set(key, data)
+    if etag is not None:
+        response.headers["ETag"] = etag
+    return data
 
 
 @app.post("/vehicles", response_model=VehicleOut)
@@ -148,11 +347,29 @@ def create_vehicle(vehicle: VehicleCreate, db: Session = Depends(get_db)):
     """
     new_vehicle = Vehicle(**vehicle.model_dump())  # unpack dict into ORM model
     db.add(new_vehicle)      # stage object
-    db.commit()              # save to DB
-    db.refresh(new_vehicle)  # get generated ID
+    db.commit()              # save to DB (ID filled in by the INSERT)
+    cache.delete(vehicle_key(new_vehicle.id))
+    versions.bump("vehicles")
     return new_vehicle
 
 
+@app.post("/vehicles/bulk")
+async def bulk_create_vehicles(
+    request: Request,
+    batch_size: int = Query(500, ge=1, le=5000)
+):
+    """
+    POST many vehicles at once (JSON array, NDJSON or CSV body).
+    - every row is validated with VehicleCreate
+    - rows are inserted batch_size at a time, one transaction per batch
+    - returns counts plus the row number and reason of every failure
+    """
+    try:
+        return await bulk_import(request, Vehicle, VehicleCreate, batch_size)
+    finally:
+        versions.bump("vehicles")   # some batches may have committed
+
+
 @app.put("/vehicles/{vehicle_id}", response_model=VehicleOut)
 def update_vehicle(
     vehicle_id: int,
@@ -161,34 +378,45 @@ def update_vehicle(
 ):
     """
     PUT: Update a vehicle's data
-    - Find vehicle by ID
-    - Update fields using setattr
-    - Save changes
+    - One UPDATE ... WHERE id = :id, no SELECT first
+    - rowcount 0 means no such vehicle -> 404
+      (MySQL reports matched rows, so an unchanged row still counts)
+    - PUT replaces every field, so the response is built from the
+      request body plus the ID without reading the row back
     """
-    vehicle = db.query(Vehicle).filter(Vehicle.id == vehicle_id).first()
-    if not vehicle:
+    data = updated_vehicle.model_dump()
+    result = db.execute(
+        update(Vehicle)
+        .where(Vehicle.id == vehicle_id)
+        .values(**data)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Vehicle not found")
 
-    # Loop through fields in request and update ORM object
-    for key, value in updated_vehicle.model_dump().items():
-        setattr(vehicle, key, value)
-
     db.commit()              # save updates
-    db.refresh(vehicle)      # refresh ORM object
-    return vehicle
+    cache.delete(vehicle_key(vehicle_id))
+    versions.bump("vehicles")
+    return VehicleOut(id=vehicle_id, **data)
 
 
 @app.delete("/vehicles/{vehicle_id}")
 def delete_vehicle(vehicle_id: int, db: Session = Depends(get_db)):
     """
     DELETE a vehicle by ID
-    - Raises 404 if not found
+    - One DELETE ... WHERE id = :id, no SELECT first
+    - Raises 404 if no row was deleted
     - Commits deletion to DB
     """
-    vehicle = db.query(Vehicle).filter(Vehicle.id == vehicle_id).first()
-    if not vehicle:
+    result = db.execute(
+        delete(Vehicle)
+        .where(Vehicle.id == vehicle_id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Vehicle not found")
 
-    db.delete(vehicle)  # stage deletion
     db.commit()         # execute deletion
+    cache.delete(vehicle_key(vehicle_id))
+    versions.bump("vehicles")
     return {"message": "Vehicle deleted", "id": vehicle_id}
@@ -0,0 +1,125 @@
+# Connection pool settings and metrics, copied into every project with a
+# SQLAlchemy pool (check_copies.py in projects/ fails when the copies
+# differ)
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+# ------------------------------
+# 1. Pool settings from the environment
+# ------------------------------
+# DB_POOL_SIZE       connections kept open in the pool
+# DB_MAX_OVERFLOW    extra connections allowed above the pool size
+# DB_POOL_TIMEOUT    seconds to wait for a free connection
+# DB_POOL_RECYCLE    seconds before a connection is replaced
+#                    (keep below MySQL's wait_timeout)
+# DB_POOL_PRE_PING   test connections on checkout, drop stale ones
+
+
+def pool_settings():
+    """Keyword arguments for create_engine / create_async_engine"""
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower()
+        in ("1", "true", "yes"),
+    }
+
+
+# ------------------------------
+# 2. Pool metrics
+# ------------------------------
+class PoolMetrics:
+    """Counters fed by pool events and by the timed pool class below"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0         # new DBAPI connections opened
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0    # connections dropped (e.g. failed ping)
+        self.timeouts = 0         # checkouts that gave up waiting
+        self.in_use = 0
+        self.max_in_use = 0
+        self.wait_total = 0.0     # seconds spent waiting for checkouts
+        self.wait_max = 0.0
+
+    def attach(self, engine):
+        """Listen to pool events of a (sync) engine"""
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def pool_class(self, base):
+        """
+        Subclass of `base` (QueuePool, AsyncAdaptedQueuePool, ...) that
+        times every checkout, including the wait for a free connection.
+        """
+        metrics = self
+
+        class TimedPool(base):
+            def connect(self):
+                start = time.perf_counter()
+                try:
+                    return super().connect()
+                except PoolTimeoutError:
+                    with metrics._lock:
+                        metrics.timeouts += 1
+                    raise
+                finally:
+                    metrics._record_wait(time.perf_counter() - start)
+
+        TimedPool.__name__ = f"Timed{base.__name__}"
+        return TimedPool
+
+    def _record_wait(self, seconds):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record,
+                     connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self.in_use = max(self.in_use - 1, 0)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self, pool):
+        """Current counters plus the pool's own view, as a dict"""
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            stats = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "checkout_wait_avg_ms": round(
+                    self.wait_total / waits * 1000, 3) if waits else 0.0,
+                "checkout_wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, name):
+                stats[f"pool_{name}"] = getattr(pool, name)()
+        return stats
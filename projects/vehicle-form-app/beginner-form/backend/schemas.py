@@ -0,0 +1,51 @@
+# ================================
+# schemas.py - Pydantic schemas shared by the sync and async routes
+# ================================
+
+from pydantic import BaseModel
+
+# -----------------------------
+# Pydantic Schemas
+# -----------------------------
+# Pydantic models define the "shape" of data sent to/returned from API
+# They validate inputs and control JSON serialization
+
+# User schemas
+
+
+class UserCreate(BaseModel):
+    """Schema for creating a new user"""
+    name: str
+    email: str
+
+
+class UserOut(UserCreate):
+    """Schema for returning user info (includes ID)"""
+    id: int
+
+    class Config:
+        # allows SQLAlchemy objects to be converted to JSON automatically
+        from_attributes = True
+
+# Vehicle schemas
+
+
+class VehicleCreate(BaseModel):
+    """Schema for creating a vehicle"""
+    make: str
+    model: str
+    year: int
+    colour: str
+    body: str
+    doors: int
+    transmission: str
+    engineSize: float
+    fuel: str
+
+
+class VehicleOut(VehicleCreate):
+    """Schema for returning a vehicle (includes ID)"""
+    id: int
+
+    class Config:
+        from_attributes = True
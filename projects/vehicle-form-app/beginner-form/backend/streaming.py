@@ -0,0 +1,61 @@
+# ================================
+# streaming.py - NDJSON streaming helpers (sync and async sessions)
+# ================================
+
+from fastapi import Request
+from sqlalchemy import select
+
+from database import SessionLocal
+
+# -----------------------------
+# NDJSON streaming
+# -----------------------------
+# Clients sending "Accept: application/x-ndjson" get one JSON object
+# per line, read from the DB and sent in batches, so memory use and
+# time-to-first-byte don't grow with the table size.
+NDJSON = "application/x-ndjson"
+STREAM_BATCH = 500
+
+
+def wants_ndjson(request: Request) -> bool:
+    """True when the client asked for newline-delimited JSON"""
+    return NDJSON in request.headers.get("accept", "")
+
+
+def stream_rows(model, schema):
+    """
+    Yield every row of `model` as NDJSON, STREAM_BATCH rows per chunk.
+    - yield_per fetches rows in batches instead of all at once
+    - opens its own session: the request's session is closed
+      before the response body starts streaming
+    """
+    db = SessionLocal()
+    try:
+        lines = []
+        for row in db.query(model).yield_per(STREAM_BATCH):
+            lines.append(schema.model_validate(row).model_dump_json() + "\n")
+            if len(lines) == STREAM_BATCH:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+    finally:
+        db.close()
+
+
+async def astream_rows(session_factory, model, schema):
+    """
+    Async twin of stream_rows for AsyncSession factories.
+    - stream_scalars uses a server-side cursor, STREAM_BATCH rows at a time
+    """
+    async with session_factory() as db:
+        result = await db.stream_scalars(
+            select(model).execution_options(yield_per=STREAM_BATCH))
+        lines = []
+        async for row in result:
+            lines.append(schema.model_validate(row).model_dump_json() + "\n")
+            if len(lines) == STREAM_BATCH:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
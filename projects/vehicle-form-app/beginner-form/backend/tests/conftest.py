@@ -0,0 +1,10 @@
+# Run from the backend folder:  python -m pytest tests
+# The tests use a throwaway SQLite file instead of the MySQL database
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(), "test.db"))
@@ -0,0 +1,66 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+
+def post(body, content_type):
+    response = client.post("/users/bulk", content=body,
+                           headers={"Content-Type": content_type})
+    assert response.status_code == 200
+    return response.json()
+
+
+def email():
+    return f"{uuid.uuid4().hex}@example.com"
+
+
+def test_invalid_utf8_is_a_row_error():
+    body = (f'{{"name": "a", "email": "{email()}"}}\n'.encode()
+            + b'{"name": "\xff\xfe"}\n'
+            + f'{{"name": "c", "email": "{email()}"}}\n'.encode())
+    result = post(body, "application/x-ndjson")
+    assert result["inserted"] == 2
+    assert [error["row"] for error in result["errors"]] == [2]
+    assert "UTF-8" in result["errors"][0]["errors"][0]
+
+    body = b"name,email\n\xff,x@example.com\n" + \
+        f"ok,{email()}\n".encode()
+    result = post(body, "text/csv")
+    assert result["inserted"] == 1
+    assert [error["row"] for error in result["errors"]] == [1]
+
+
+def test_errors_come_back_in_row_order():
+    taken = email()
+    post(f'{{"name": "a", "email": "{taken}"}}', "application/x-ndjson")
+    # row 2 fails in the database (duplicate email, found when the
+    # batch is inserted), row 3 fails validation straight away
+    body = "\n".join([f'{{"name": "a", "email": "{email()}"}}',
+                      f'{{"name": "b", "email": "{taken}"}}',
+                      '{"name": "c"}'])
+    result = post(body, "application/x-ndjson")
+    assert [error["row"] for error in result["errors"]] == [2, 3]
+
+
+def test_csv_quoted_values_may_span_lines():
+    first, second = email(), email()
+    body = (f'name,email\n"Ada\nLovelace",{first}\n'
+            f'"Say ""hi""",{second}\n')
+    result = post(body, "text/csv")
+    assert result == {"received": 2, "inserted": 2, "failed": 0,
+                      "errors": []}
+    names = {user["email"]: user["name"]
+             for user in client.get("/users/").json()}
+    assert names[first] == "Ada\nLovelace"
+    assert names[second] == 'Say "hi"'
+
+
+def test_unterminated_quote_is_reported():
+    result = post(f'name,email\n"Ada,{email()}\n', "text/csv")
+    assert result["inserted"] == 0
+    assert result["errors"] == [{"row": 1,
+                                 "errors": ["Unterminated quoted value"]}]
@@ -0,0 +1,99 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from cache import FakeRedis, LRUCache, NullCache, RedisCache, make_cache
+
+client = TestClient(main.app)
+
+VEHICLE = {"make": "Ford", "model": "Focus", "year": 2019,
+           "colour": "blue", "body": "hatchback", "doors": 5,
+           "transmission": "manual", "engineSize": 1.0, "fuel": "petrol"}
+
+
+class Clock:
+    """Time that only moves when a test moves it"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def lru(clock, **kwargs):
+    return LRUCache(clock=clock, **kwargs)
+
+
+def redis(clock, **kwargs):
+    return RedisCache(FakeRedis(clock=clock), **kwargs)
+
+
+@pytest.mark.parametrize("make", [lru, redis])
+def test_entries_expire_after_the_ttl(make):
+    clock = Clock()
+    cache = make(clock, ttl=5)
+    cache.set("vehicle:1", {"id": 1})
+    clock.now += 4
+    assert cache.get("vehicle:1") == {"id": 1}
+    clock.now += 2
+    assert cache.get("vehicle:1") is None
+    assert cache.info()["hits"] == 1
+    assert cache.info()["misses"] == 1
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = lru(Clock(), max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1          # "b" is now the oldest
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.info()["evictions"] == 1
+    assert cache.info()["entries"] == 2
+
+
+@pytest.mark.parametrize("make", [lru, redis])
+def test_counters(make):
+    cache = make(Clock())
+    assert cache.get("x") is None
+    cache.set("x", {"v": 1})
+    assert cache.get("x") == {"v": 1}
+    assert cache.get("x") == {"v": 1}
+    cache.delete("x")
+    cache.delete("x")                   # already gone: not counted
+    info = cache.info()
+    assert (info["hits"], info["misses"], info["invalidations"]) == \
+        (2, 1, 1)
+    assert info["hit_ratio"] == round(2 / 3, 4)
+
+
+def test_make_cache_backends():
+    assert isinstance(make_cache("memory"), LRUCache)
+    assert isinstance(make_cache("none"), NullCache)
+    fake = FakeRedis()
+    cache = make_cache("redis", client=fake)
+    assert isinstance(cache, RedisCache) and cache.client is fake
+    assert isinstance(make_cache("fakeredis").client, FakeRedis)
+
+
+@pytest.mark.parametrize("make", [lru, redis])
+def test_writes_invalidate_the_cached_vehicle(make, monkeypatch):
+    cache = make(Clock())
+    monkeypatch.setattr(main, "cache", cache)
+    vehicle_id = client.post("/vehicles", json=VEHICLE).json()["id"]
+    url = f"/vehicles/{vehicle_id}"
+
+    assert client.get(url).json()["model"] == "Focus"     # miss
+    assert client.get(url).json()["model"] == "Focus"     # hit
+    assert client.put(url, json={**VEHICLE, "model": "Fiesta"}
+                      ).status_code == 200
+    assert client.get(url).json()["model"] == "Fiesta"    # miss again
+    assert client.delete(url).status_code == 200
+    assert client.get(url).status_code == 404
+
+    info = cache.info()
+    assert (info["hits"], info["misses"]) == (1, 3)
+    assert info["invalidations"] == 2